@@ -1,14 +1,12 @@
 from __future__ import absolute_import, division, print_function
 
-import requests
-
 from pyoos.collectors.collector import Collector
 from pyoos.parsers.awc import AwcToPaegan
 
 
 class AwcRest(Collector):
     def __init__(self, **kwargs):
-        super(AwcRest, self).__init__()
+        super(AwcRest, self).__init__(**kwargs)
         self.stations_url = (
             "https://www.aviationweather.gov/docs/metar/stations.txt"
         )
@@ -18,16 +16,18 @@ class AwcRest(Collector):
 
     def get_stations(self):
         if self._features is None:
-            r = requests.get(self.stations_url)
-            # Arghhhh Fortran-like fixed format!!!
-            _stations = [
-                line[20:24]
-                for line in r.text.split("\n")
-                if len(line) == 83 and not line.startswith("!")
-            ]
-            self._stations = sorted(
-                filter(lambda code: code.strip(), _stations)
-            )
+
+            def fetch():
+                r = self.session.get(self.stations_url)
+                # Arghhhh Fortran-like fixed format!!!
+                _stations = [
+                    line[20:24]
+                    for line in r.text.split("\n")
+                    if len(line) == 83 and not line.startswith("!")
+                ]
+                return sorted(filter(lambda code: code.strip(), _stations))
+
+            self._stations = self._get_catalog(self.stations_url, fetch)
             self._features = self._stations
         return self._features
 
@@ -51,11 +51,13 @@ class AwcRest(Collector):
                     kwargs["minLon"] = x
                     kwargs["maxLat"] = y + 2
                     kwargs["maxLon"] = x + 2
-                    r.append(requests.get(self.data_url, params=kwargs).text)
+                    r.append(
+                        self.session.get(self.data_url, params=kwargs).text
+                    )
                     y += 2
                 x += 2
         else:
-            r.append(requests.get(self.data_url, params=kwargs).text)
+            r.append(self.session.get(self.data_url, params=kwargs).text)
         return r
 
     def setup_params(self, **kwargs):
@@ -2,14 +2,56 @@ from __future__ import absolute_import, division, print_function
 
 import pytz
 
+from pyoos.utils.cache import CatalogCache
+from pyoos.utils.http import get_session
+
 
 class Collector(object):
-    def __init__(self):
+    def __init__(self, **kwargs):
+        """
+        :param session: optional requests.Session (usually a
+                        pyoos.utils.http.PyoosSession) to make requests with.
+                        Defaults to a session shared by all collectors.
+        :param catalog_cache: optional pyoos.utils.cache.CatalogCache to keep
+                              station catalogs in between runs, or True to
+                              use one in the default cache directory.
+        """
         self._end_time = None
         self._start_time = None
         self._bbox = None
         self._variables = None
         self._features = None
+        self._session = kwargs.get("session")
+
+        catalog_cache = kwargs.get("catalog_cache")
+        if catalog_cache is True:
+            catalog_cache = CatalogCache()
+        self.catalog_cache = catalog_cache or None
+
+    def get_session(self):
+        """
+            The HTTP session all requests of this collector are made through
+        """
+        if self._session is None:
+            return get_session()
+        return self._session
+
+    def set_session(self, session):
+        self._session = session
+
+    session = property(get_session, set_session)
+
+    def _get_catalog(self, endpoint, fetch, force=False):
+        """
+            Returns fetch(), going through the catalog cache (keyed by this
+            collector's class and endpoint) if one is configured.  With
+            force, the cached entry is refreshed even if it is fresh.
+        """
+        if self.catalog_cache is None:
+            return fetch()
+        return self.catalog_cache.get_or_fetch(
+            type(self).__name__, endpoint, fetch, force=force
+        )
 
     def get_start_time(self):
         """
@@ -1,9 +1,23 @@
 from __future__ import absolute_import, division, print_function
 
+from datetime import timedelta
+
 from pyoos.collectors.ioos.swe_sos import IoosSweSos
 
 
 class CoopsSos(IoosSweSos):
+    single_offering = True
+    # CO-OPS limits the time range of a request by the data interval
+    default_max_window = timedelta(days=30)
+    max_windows = {
+        "PreliminaryOneMinute": timedelta(days=4),
+        "VerifiedHourlyHeight": timedelta(days=365),
+        "VerifiedHighLow": timedelta(days=365),
+        "VerifiedDailyMean": timedelta(days=3650),
+        "HourlyTidePredictions": timedelta(days=365),
+        "HighLowTidePredictions": timedelta(days=365),
+    }
+
     def __init__(self, **kwargs):
         kwargs["url"] = "https://opendap.co-ops.nos.noaa.gov/ioos-dif-sos/SOS"
         super(CoopsSos, self).__init__(**kwargs)
@@ -18,6 +32,11 @@ class CoopsSos(IoosSweSos):
 
     dataType = property(get_datatype, set_datatype)
 
+    def get_max_window(self):
+        if self.max_window is None and self.dataType in self.max_windows:
+            return self.max_windows[self.dataType]
+        return super(CoopsSos, self).get_max_window()
+
     def set_datum(self, datum):
         self._datum = datum
 
@@ -47,11 +66,14 @@ class CoopsSos(IoosSweSos):
     def setup_params(self, **kwargs):
         params = super(CoopsSos, self).setup_params(**kwargs)
 
-        if self.features is None or len(self.features) != 1:
+        if self.features is None or len(self.features) < 1:
             params["offerings"] = ["urn:ioos:network:NOAA.NOS.CO-OPS:All"]
-        elif len(self.features) == 1:
+        else:
+            # Several stations are requested concurrently and merged (see
+            # single_offering)
             params["offerings"] = [
-                "urn:ioos:station:NOAA.NOS.CO-OPS:%s" % self.features[0]
+                "urn:ioos:station:NOAA.NOS.CO-OPS:%s" % f
+                for f in self.features
             ]
 
         if self.datum is not None:
@@ -1,21 +1,90 @@
 from __future__ import absolute_import, division, print_function
 
-import os.path
 import re
+import warnings
 from datetime import datetime
 
+import numpy as np
 import pytz
-import requests
 from bs4 import BeautifulSoup
-from fiona import collection
 
 from pyoos.collectors.collector import Collector
+from pyoos.collectors.hads.states import get_state_index
 from pyoos.parsers.hads import HadsParser
+from pyoos.utils.concurrency import DEFAULT_MAX_WORKERS, threaded_map
+
+
+def _join_lines(texts):
+    """
+    Concatenates line based response texts, making sure each one ends with
+    a line break.
+    """
+    return "".join(t if not t or t.endswith("\n") else t + "\n" for t in texts)
+
+
+class StationLocationCache(object):
+    """
+    Keeps the coordinates of every station whose metadata has been fetched
+    in arrays sorted by longitude, so a bbox filter is a binary search plus
+    a vectorized mask instead of a metadata download.
+
+    Used internally.
+    """
+
+    def __init__(self):
+        self.codes = np.array([], dtype=object)
+        self.lons = np.array([], dtype=np.float64)
+        self.lats = np.array([], dtype=np.float64)
+
+    def missing(self, codes):
+        """
+        Returns the codes (in the given order) that have no known location.
+        """
+        if not len(codes):
+            return []
+        known = np.isin(np.array(codes, dtype=object), self.codes)
+        return [code for code, k in zip(codes, known) if not k]
+
+    def update(self, parsed_metadata):
+        """
+        Adds or replaces locations from HadsParser._parse_metadata output.
+        """
+        locations = {
+            code: (lon, lat)
+            for code, lon, lat in zip(self.codes, self.lons, self.lats)
+        }
+        for code, station in parsed_metadata.items():
+            locations[code] = (station["longitude"], station["latitude"])
+
+        codes = list(locations)
+        lons = np.array([locations[c][0] for c in codes], dtype=np.float64)
+        order = np.argsort(lons, kind="mergesort")
+
+        self.codes = np.array(codes, dtype=object)[order]
+        self.lons = lons[order]
+        self.lats = np.array(
+            [locations[c][1] for c in codes], dtype=np.float64
+        )[order]
+
+    def within(self, bbox, codes):
+        """
+        Returns the codes (in the given order) located within the
+        (minx, miny, maxx, maxy) bbox. Codes without a location are dropped.
+        """
+        lo = np.searchsorted(self.lons, bbox[0], side="left")
+        hi = np.searchsorted(self.lons, bbox[2], side="right")
+        lats = self.lats[lo:hi]
+        inside = self.codes[lo:hi][(lats >= bbox[1]) & (lats <= bbox[3])]
+
+        if not len(codes):
+            return []
+        mask = np.isin(np.array(codes, dtype=object), inside)
+        return [code for code, m in zip(codes, mask) if m]
 
 
 class Hads(Collector):
     def __init__(self, **kwargs):
-        super(Hads, self).__init__()
+        super(Hads, self).__init__(**kwargs)
 
         self.states_url = kwargs.get(
             "states_url", "https://hads.ncep.noaa.gov/hads/goog_earth/"
@@ -29,7 +98,15 @@ class Hads(Collector):
             "https://hads.ncep.noaa.gov/nexhads2/servlet/DecodedData",
         )
 
+        # max concurrent requests when fanning out over states or chunks
+        self.max_workers = kwargs.get("max_workers", DEFAULT_MAX_WORKERS)
+        # max station codes sent in a single DCPInfo/DecodedData request
+        self.chunk_size = kwargs.get("chunk_size", 200)
+        self.failed_chunks = []
+
         self.station_codes = None
+        # survives bbox changes, station locations don't move
+        self.station_locations = StationLocationCache()
         self.parser = HadsParser()
 
     def clear(self):
@@ -51,6 +128,7 @@ class Hads(Collector):
         """
         List available variables and applies any filters.
         """
+        self.failed_chunks = []
         station_codes = self._get_station_codes()
         station_codes = self._apply_features_filter(station_codes)
         variables = self._list_variables(station_codes)
@@ -77,19 +155,12 @@ class Hads(Collector):
         rvar = re.compile(r"\n\s([A-Z]{2}[A-Z0-9]{0,1})\(\w+\)")
 
         variables = set()
-        resp = requests.post(
+        for text in self._post_chunked(
             self.obs_retrieval_url,
-            data={
-                "state": "nil",
-                "hsa": "nil",
-                "of": "3",
-                "extraids": " ".join(station_codes),
-                "sinceday": -1,
-            },
-        )
-        resp.raise_for_status()
-
-        list(map(variables.add, rvar.findall(resp.text)))
+            station_codes,
+            {"state": "nil", "hsa": "nil", "of": "3", "sinceday": -1},
+        ):
+            variables.update(rvar.findall(text))
         return variables
 
     def list_features(self):
@@ -108,16 +179,20 @@ class Hads(Collector):
             self.end_time if hasattr(self, "end_time") else None,
         )
 
-        metadata, raw_data = self.raw(**kwargs)
+        metadata, raw_data = self.raw(stream=True, **kwargs)
         return self.parser.parse(metadata, raw_data, var_filter, time_extents)
 
-    def raw(self, format=None, **kwargs):
+    def raw(self, format=None, stream=False, **kwargs):
         """
         Returns a tuple of (metadata, raw data)
+
+        If stream is True, raw data is an iterator over the lines of the
+        observation responses rather than one string.
         """
+        self.failed_chunks = []
         station_codes = self._apply_features_filter(self._get_station_codes())
         metadata = self._get_metadata(station_codes, **kwargs)
-        raw_data = self._get_raw_data(station_codes, **kwargs)
+        raw_data = self._get_raw_data(station_codes, stream=stream, **kwargs)
 
         return (metadata, raw_data)
 
@@ -141,19 +216,116 @@ class Hads(Collector):
         else:
             verify_cert = True  # the default for requests
 
-        resp = requests.post(
-            self.metadata_url,
-            data={
-                "state": "nil",
-                "hsa": "nil",
-                "of": "1",
-                "extraids": " ".join(station_codes),
-                "data": "Get Meta Data",
-            },
-            verify=verify_cert,
+        return _join_lines(
+            self._post_chunked(
+                self.metadata_url,
+                station_codes,
+                {
+                    "state": "nil",
+                    "hsa": "nil",
+                    "of": "1",
+                    "data": "Get Meta Data",
+                },
+                verify=verify_cert,
+            )
+        )
+
+    def _post_chunked(self, url, station_codes, data, **kwargs):
+        """
+        POSTs data to url for chunks of at most chunk_size station codes
+        (sent as extraids), concurrently, and returns the response texts in
+        chunk order.
+
+        Failed chunks are added to failed_chunks as (station codes,
+        exception) and reported with a warning. If every chunk fails the
+        first error is raised. failed_chunks is reset by each raw() and
+        list_variables() call, so it covers all of their requests.
+        """
+        chunks = self._chunks(station_codes)
+        results = threaded_map(
+            lambda chunk: self._post_chunk(url, chunk, data, **kwargs).text,
+            chunks,
+            max_workers=self.max_workers,
+            return_exceptions=True,
         )
-        resp.raise_for_status()
-        return resp.text
+
+        self._report_failures(
+            chunks,
+            [
+                (chunk, result)
+                for chunk, result in zip(chunks, results)
+                if isinstance(result, Exception)
+            ],
+        )
+        return [r for r in results if not isinstance(r, Exception)]
+
+    def _iter_chunked_lines(self, url, station_codes, data, **kwargs):
+        """
+        Like _post_chunked, but yields the decoded lines of the responses
+        without holding their bodies in memory.
+
+        Chunks are requested one at a time, the next only once the previous
+        response has been read and closed, so a single connection is held
+        and nothing is left open if iteration stops early.
+        """
+        chunks = self._chunks(station_codes)
+        failed = []
+        for chunk in chunks:
+            try:
+                resp = self._post_chunk(
+                    url, chunk, data, stream=True, **kwargs
+                )
+            except Exception as e:
+                failed.append((chunk, e))
+                continue
+
+            try:
+                if resp.encoding is None:
+                    resp.encoding = "utf-8"
+                for line in resp.iter_lines(decode_unicode=True):
+                    yield line
+            finally:
+                resp.close()
+
+        self._report_failures(chunks, failed)
+
+    def _chunks(self, station_codes):
+        station_codes = list(station_codes)
+        return [
+            station_codes[i : i + self.chunk_size]
+            for i in range(0, len(station_codes), self.chunk_size)
+        ] or [[]]
+
+    def _post_chunk(self, url, chunk, data, stream=False, **kwargs):
+        resp = self.session.post(
+            url,
+            data=dict(data, extraids=" ".join(chunk)),
+            stream=stream,
+            **kwargs
+        )
+        try:
+            resp.raise_for_status()
+        except Exception:
+            resp.close()
+            raise
+        return resp
+
+    def _report_failures(self, chunks, failed):
+        """
+        Records the (chunk, exception) pairs of failed chunk requests in
+        failed_chunks and warns about them, or raises the first error if
+        every chunk failed.
+        """
+        self.failed_chunks.extend(failed)
+        if len(failed) == len(chunks):
+            raise failed[0][1]
+
+        for chunk, e in failed:
+            warnings.warn(
+                "HADS request for {} stations ({}...) failed: {}".format(
+                    len(chunk), chunk[0], e
+                )
+            )
 
     def _get_station_codes(self, force=False):
         """
@@ -164,74 +336,69 @@ class Hads(Collector):
         if not force and self.station_codes is not None:
             return self.station_codes
 
-        state_urls = self._get_state_urls()
+        state_urls = self._get_state_urls(force=force)
 
-        # filter by bounding box against a shapefile
+        # filter by bounding box against the state polygons
         state_matches = None
 
         if self.bbox:
-            with collection(
-                os.path.join(
-                    "resources",
-                    "ne_50m_admin_1_states_provinces_lakes_shp.shp",
-                ),
-                "r",
-            ) as c:
-                geom_matches = [
-                    x["properties"] for x in c.filter(bbox=self.bbox)
-                ]
-                state_matches = [
-                    x["postal"] if x["admin"] != "Canada" else "CN"
-                    for x in geom_matches
-                ]
-
-        self.station_codes = []
+            state_matches = get_state_index().states_in_bbox(self.bbox)
 
-        for state_url in state_urls:
-            if state_matches is not None:
-                state_abbr = state_url.split("/")[-1].split(".")[0]
-                if state_abbr not in state_matches:
-                    continue
+        if state_matches is not None:
+            state_urls = [
+                state_url
+                for state_url in state_urls
+                if state_url.split("/")[-1].split(".")[0] in state_matches
+            ]
 
-            self.station_codes.extend(self._get_stations_for_state(state_url))
+        # fetch the state pages concurrently, results keep state_urls order
+        self.station_codes = []
+        for state_codes in threaded_map(
+            lambda url: self._get_stations_for_state(url, force=force),
+            state_urls,
+            max_workers=self.max_workers,
+        ):
+            self.station_codes.extend(state_codes)
 
         if self.bbox:
-            # retrieve metadata for all stations to properly filter them
-            metadata = self._get_metadata(self.station_codes)
-            parsed_metadata = self.parser._parse_metadata(metadata)
-
-            def in_bbox(code):
-                lat = parsed_metadata[code]["latitude"]
-                lon = parsed_metadata[code]["longitude"]
-
-                return (
-                    lon >= self.bbox[0]
-                    and lon <= self.bbox[2]
-                    and lat >= self.bbox[1]
-                    and lat <= self.bbox[3]
+            # only retrieve metadata for stations we haven't located yet
+            missing = self.station_locations.missing(self.station_codes)
+            if missing:
+                metadata = self._get_metadata(missing)
+                self.station_locations.update(
+                    self.parser._parse_metadata(metadata)
                 )
 
-            self.station_codes = list(filter(in_bbox, self.station_codes))
+            self.station_codes = self.station_locations.within(
+                self.bbox, self.station_codes
+            )
 
         return self.station_codes
 
-    def _get_state_urls(self):
-        root = BeautifulSoup(requests.get(self.states_url).text)
-        areas = root.find_all("area")
-        return list({x.attrs.get("href", None) for x in areas})
-
-    def _get_stations_for_state(self, state_url):
-        state_root = BeautifulSoup(requests.get(state_url).text)
-        return [
-            x
-            for x in [
-                x.attrs["href"].split("nesdis_id=")[-1]
-                for x in state_root.find_all("a")
+    def _get_state_urls(self, force=False):
+        def fetch():
+            root = BeautifulSoup(self.session.get(self.states_url).text)
+            areas = root.find_all("area")
+            hrefs = {x.attrs.get("href", None) for x in areas}
+            return sorted(href for href in hrefs if href)
+
+        return self._get_catalog(self.states_url, fetch, force=force)
+
+    def _get_stations_for_state(self, state_url, force=False):
+        def fetch():
+            state_root = BeautifulSoup(self.session.get(state_url).text)
+            return [
+                x
+                for x in [
+                    x.attrs["href"].split("nesdis_id=")[-1]
+                    for x in state_root.find_all("a")
+                ]
+                if len(x) > 0
             ]
-            if len(x) > 0
-        ]
 
-    def _get_raw_data(self, station_codes, **kwargs):
+        return self._get_catalog(state_url, fetch, force=force)
+
+    def _get_raw_data(self, station_codes, stream=False, **kwargs):
         if "verify" in kwargs:
             verify_cert = kwargs["verify"]
         else:
@@ -252,17 +419,13 @@ class Hads(Collector):
             else:
                 since = min(7, timediff.days)  # max of 7 days
 
-        resp = requests.post(
+        post = self._iter_chunked_lines if stream else self._post_chunked
+        responses = post(
             self.obs_retrieval_url,
-            data={
-                "state": "nil",
-                "hsa": "nil",
-                "of": "1",
-                "extraids": " ".join(station_codes),
-                "sinceday": since,
-            },
+            station_codes,
+            {"state": "nil", "hsa": "nil", "of": "1", "sinceday": since},
             verify=verify_cert,
         )
-        resp.raise_for_status()
-
-        return resp.text
+        if stream:
+            return responses
+        return _join_lines(responses)
@@ -0,0 +1,87 @@
+from __future__ import absolute_import, division, print_function
+
+import numbers
+import os.path
+import threading
+
+from fiona import collection
+from shapely.geometry import box, shape
+from shapely.prepared import prep
+from shapely.strtree import STRtree
+
+STATES_SHAPEFILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    "resources",
+    "ne_50m_admin_1_states_provinces_lakes_shp.shp",
+)
+
+
+class StateIndex(object):
+    """
+    Spatial index over the state/province polygons HADS organizes its
+    stations by.
+
+    The shapefile is read once and its polygons are kept, prepared, in an
+    STRtree so bbox lookups don't touch the disk.
+    """
+
+    def __init__(self, path=STATES_SHAPEFILE):
+        self._geoms = []
+        self._prepared = []
+        self._abbrs = []
+
+        with collection(path, "r") as c:
+            for feature in c:
+                if feature["geometry"] is None:
+                    continue
+
+                props = feature["properties"]
+                geom = shape(feature["geometry"])
+                self._geoms.append(geom)
+                self._prepared.append(prep(geom))
+                # HADS lumps all of Canada together
+                self._abbrs.append(
+                    props["postal"] if props["admin"] != "Canada" else "CN"
+                )
+
+        self._tree = STRtree(self._geoms)
+        # Shapely < 2.0 returns geometries rather than indices from query()
+        self._geom_idx = {id(g): i for i, g in enumerate(self._geoms)}
+
+    def states_in_bbox(self, bbox):
+        """
+        Returns the abbreviations of the states whose polygons intersect the
+        (minx, miny, maxx, maxy) bbox, in shapefile order and without
+        duplicates.
+        """
+        query = box(*bbox)
+
+        hits = []
+        for hit in self._tree.query(query):
+            if isinstance(hit, numbers.Integral):
+                hits.append(int(hit))
+            else:
+                hits.append(self._geom_idx[id(hit)])
+
+        abbrs = []
+        for i in sorted(hits):
+            abbr = self._abbrs[i]
+            if abbr not in abbrs and self._prepared[i].intersects(query):
+                abbrs.append(abbr)
+
+        return abbrs
+
+
+_state_index = None
+_state_index_lock = threading.Lock()
+
+
+def get_state_index():
+    """
+    Returns the process wide StateIndex, loading it on first use.
+    """
+    global _state_index
+    with _state_index_lock:
+        if _state_index is None:
+            _state_index = StateIndex()
+        return _state_index
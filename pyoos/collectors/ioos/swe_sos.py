@@ -1,88 +1,285 @@
 from __future__ import absolute_import, division, print_function
 
+import csv
+import hashlib
+import socket
+import threading
+import warnings
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pytz
+import requests
+
+from owslib.namespaces import Namespaces
 from owslib.ows import ExceptionReport
 from owslib.sos import SensorObservationService as Sos
+from owslib.swe.observation.sos100 import SosCapabilitiesReader
 from owslib.swe.sensor.sml import SensorML
 from owslib.util import ServiceException
-from six import string_types
+from six import StringIO, binary_type, string_types
 
 from pyoos.collectors.collector import Collector
-from pyoos.parsers.ioos.get_observation import IoosGetObservation
+from pyoos.parsers.ioos.csv_observations import (
+    CsvObservations,
+    split_header,
+)
+from pyoos.parsers.ioos.get_observation import (
+    IoosGetObservation,
+    iter_observations,
+)
+from pyoos.utils.concurrency import DEFAULT_MAX_WORKERS, threaded_map
+from pyoos.utils.etree import etree, parse_root
+
+# Parsed GetCapabilities documents shared by all collectors:
+# url -> (sha1 of the document, Sos, response formats by offering)
+_capabilities = {}
+_capabilities_lock = threading.Lock()
 
 
 class IoosSweSos(Collector):
-    def __init__(self, url, xml=None):
-        super(IoosSweSos, self).__init__()
-        self.server = Sos(url, xml=xml)
+    # Set when the service accepts only one offering per GetObservation
+    # request, so requests for several offerings have to be split
+    single_offering = False
+    # Longest time range (timedelta) the service returns in one
+    # GetObservation request, None if it has no limit
+    default_max_window = None
 
-    def metadata(
-        self, output_format=None, feature_name_callback=None, **kwargs
-    ):
+    def __init__(self, url, xml=None, **kwargs):
         """
-        Gets SensorML objects for all procedures in your filtered features.
+        :param max_workers: maximum number of concurrent requests made to
+                            the service (1 makes them one at a time).
+        :param timeout: default timeout (seconds) of a DescribeSensor
+                        request.
+        :param max_window: longest time range (timedelta) a single
+                           GetObservation request may cover, longer ranges
+                           are split. Defaults to default_max_window,
+                           which only applies to text/csv requests.
 
-        You should override the default output_format for servers that do not
-        respond properly.
+        The GetCapabilities document (xml, if not given) is only requested
+        when the server is first used. With a catalog_cache it is kept on
+        disk and, once stale, revalidated using its ETag/Last-Modified
+        headers rather than downloaded again.
+        """
+        super(IoosSweSos, self).__init__(**kwargs)
+        self.url = url
+        self._xml = xml
+        self._server = None
+        self._response_formats = None
+        self._server_lock = threading.Lock()
+        self.max_workers = kwargs.get("max_workers", DEFAULT_MAX_WORKERS)
+        self.timeout = kwargs.get("timeout")
+        # timedelta overriding default_max_window
+        self.max_window = kwargs.get("max_window")
+        # (offering, eventTime, exception) of the parts of the last split
+        # GetObservation request that failed or could not be parsed
+        self.failed_requests = []
+
+    def get_server(self):
+        """
+        The owslib SensorObservationService, created on first use
+        """
+        with self._server_lock:
+            if self._server is None:
+                self._load_server()
+            return self._server
+
+    def set_server(self, server):
+        self._server = server
+        self._response_formats = None
+
+    server = property(get_server, set_server)
+
+    def get_response_formats(self):
+        """
+        Maps each offering name to its first ioos_sos/1.0 response format,
+        or None if it has none.
+        """
+        server = self.server
+        if self._response_formats is None:
+            self._response_formats = self._index_response_formats(server)
+        return self._response_formats
+
+    response_formats = property(get_response_formats)
+
+    @staticmethod
+    def _index_response_formats(server):
+        formats = {}
+        for off in server.offerings:
+            ioos_formats = [
+                rf for rf in off.response_formats if "ioos_sos/1.0" in rf
+            ]
+            formats[off.name] = ioos_formats[0] if ioos_formats else None
+        return formats
+
+    def _load_server(self):
+        if self._xml is not None:
+            self._server = Sos(self.url, xml=self._xml)
+            return
+
+        xml = self._get_capabilities()
+        digest = hashlib.sha1(xml).hexdigest()
+
+        # Collectors for the same, unchanged document share its parsed form
+        with _capabilities_lock:
+            cached = _capabilities.get(self.url)
+        if cached is None or cached[0] != digest:
+            server = Sos(self.url, xml=xml)
+            cached = (digest, server, self._index_response_formats(server))
+            with _capabilities_lock:
+                _capabilities[self.url] = cached
+
+        self._server, self._response_formats = cached[1:]
+
+    def _get_capabilities(self):
+        """
+        Returns the GetCapabilities document (bytes), going through the
+        catalog cache if one is configured. A stale cache entry is
+        revalidated with a conditional request and reused if the service
+        answers 304 Not Modified.
+        """
+        url = SosCapabilitiesReader().capabilities_url(self.url)
+        cache = self.catalog_cache
+        collector = type(self).__name__
+
+        cached = None
+        if cache is not None:
+            fresh = cache.get(collector, url)
+            if fresh is not None:
+                return fresh["xml"].encode("latin-1")
+            cached = cache.get(collector, url, ttl=float("inf"))
+
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = self.session.get(url, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            # Unchanged, the entry is fresh again
+            cache.set(collector, url, cached)
+            return cached["xml"].encode("latin-1")
+        response.raise_for_status()
+
+        xml = response.content
+        if cache is not None:
+            cache.set(
+                collector,
+                url,
+                {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    # latin-1 maps bytes to text one to one, so the
+                    # document is stored unchanged whatever its encoding
+                    "xml": xml.decode("latin-1"),
+                },
+            )
+        return xml
+
+    def _describe_sensors(
+        self,
+        output_format,
+        feature_name_callback,
+        max_workers,
+        catch,
+        **kwargs
+    ):
+        """
+        Makes a DescribeSensor request for every filtered feature, up to
+        max_workers at a time. Returns a (feature, SensorML or the exception
+        text of a failure) pair per feature, in feature order. Only the
+        exception types in catch are collected, anything else is raised.
         """
         callback = feature_name_callback or str
         if output_format is None:
             output_format = (
                 'text/xml; subtype="sensorML/1.0.1/profiles/ioos_sos/1.0"'
             )
+        if max_workers is None:
+            max_workers = self.max_workers
+        if "timeout" not in kwargs and self.timeout is not None:
+            kwargs["timeout"] = self.timeout
 
-        responses = []
-        if self.features is not None:
-            for feature in self.features:
-                ds_kwargs = kwargs.copy()
-                ds_kwargs.update(
-                    {
-                        "outputFormat": output_format,
-                        "procedure": callback(feature),
-                    }
-                )
+        def describe(feature):
+            ds_kwargs = kwargs.copy()
+            ds_kwargs.update(
+                {"outputFormat": output_format, "procedure": callback(feature)}
+            )
+            try:
+                return SensorML(self.server.describe_sensor(**ds_kwargs))
+            except catch as e:
+                return str(e)
 
-                responses.append(
-                    SensorML(self.server.describe_sensor(**ds_kwargs))
-                )
+        features = list(self.features or [])
+        results = threaded_map(describe, features, max_workers=max_workers)
+        return list(zip(features, results))
 
-        return responses
+    def metadata(
+        self,
+        output_format=None,
+        feature_name_callback=None,
+        max_workers=None,
+        **kwargs
+    ):
+        """
+        Gets SensorML objects for all procedures in your filtered features.
+
+        Requests are made concurrently, up to max_workers (defaults to the
+        collector's max_workers) at a time, and the responses returned in
+        feature order. Pass timeout to limit each request.
+
+        You should override the default output_format for servers that do not
+        respond properly.
+        """
+        return [
+            sml
+            for feature, sml in self._describe_sensors(
+                output_format, feature_name_callback, max_workers, (), **kwargs
+            )
+        ]
 
     def metadata_plus_exceptions(
-        self, output_format=None, feature_name_callback=None, **kwargs
+        self,
+        output_format=None,
+        feature_name_callback=None,
+        max_workers=None,
+        **kwargs
     ):
         """
         Gets SensorML objects for all procedures in your filtered features.
 
         Return two dictionaries for service responses keyed by 'feature':
             responses: values are SOS DescribeSensor response text
-            response_failures: values are exception text content furnished from ServiceException, ExceptionReport
+            response_failures: values are exception text content furnished from ServiceException, ExceptionReport, or the
+                               network error (requests.RequestException, socket.timeout) of the request
+
+        Requests are made concurrently, up to max_workers (defaults to the
+        collector's max_workers) at a time. Pass timeout to limit each
+        request.
 
         You should override the default output_format for servers that do not
         respond properly.
         """
-        callback = feature_name_callback or str
-        if output_format is None:
-            output_format = (
-                'text/xml; subtype="sensorML/1.0.1/profiles/ioos_sos/1.0"'
-            )
-
         responses = {}
         response_failures = {}
-        if self.features is not None:
-            for feature in self.features:
-                ds_kwargs = kwargs.copy()
-                ds_kwargs.update(
-                    {
-                        "outputFormat": output_format,
-                        "procedure": callback(feature),
-                    }
-                )
-                try:
-                    responses[feature] = SensorML(
-                        self.server.describe_sensor(**ds_kwargs)
-                    )
-                except (ServiceException, ExceptionReport) as e:
-                    response_failures[feature] = str(e)
+        for feature, result in self._describe_sensors(
+            output_format,
+            feature_name_callback,
+            max_workers,
+            (
+                ServiceException,
+                ExceptionReport,
+                requests.RequestException,
+                socket.timeout,
+            ),
+            **kwargs
+        ):
+            if isinstance(result, string_types):
+                response_failures[feature] = result
+            else:
+                responses[feature] = result
 
         return (responses, response_failures)
 
@@ -118,40 +315,300 @@ class IoosSweSos(Collector):
 
         return params
 
-    def collect(self, **kwargs):
+    def collect(self, dense=False, **kwargs):
+        """
+        Gets the observations of the filtered features.
+
+        With dense=True, the feature of each observation holds arrays
+        instead of paegan features: TimeSeries.columns (per sensor column
+        arrays) for timeSeries and TimeSeriesProfile.arrays (indexed by
+        time, bin and variable) for timeSeriesProfile.
+
+        text/csv responses are decoded into a CsvObservations holding a
+        NumPy array per column. When the request is split by offering or
+        time window (see _get_observations), the responses are merged into
+        one CsvObservations, its rows ordered by station and then time.
+
+        XML responses give one observation per station. They are only split
+        by time window if max_window is set, in which case every window of
+        a station is a separate observation.
+
+        Each response is parsed along with its request, so one that cannot
+        be parsed is recorded in failed_requests and the others returned
+        (see _get_observations).
+        """
+        self._set_response_format(kwargs)
+
+        def parse(params, response):
+            # text/csv responses are decoded together, once merged
+            if "csv" in (params.get("responseFormat") or ""):
+                return response
+            return IoosGetObservation(response, dense=dense).observations
+
+        params, parts = self._get_observations(parse=parse, **kwargs)
+
+        if "csv" in (params.get("responseFormat") or ""):
+            return CsvObservations([response for _, response in parts])
+
+        observations = []
+        for _, response_observations in parts:
+            observations.extend(response_observations)
+        return observations
+
+    def iter_collect(self, dense=False, **kwargs):
+        """
+        Like collect, but parses the response incrementally and yields the
+        observations one at a time. Use this for large (e.g. network wide)
+        requests. Like collect, XML requests split by time window (see
+        max_window) yield an observation per station and window.
+
+        A response that fails to parse is handled like a failed request
+        (see _get_observations), after yielding the observations read
+        before the error.
+        """
+        self._set_response_format(kwargs)
+        params, parts = self._get_observations(**kwargs)
+
+        for request, response in parts:
+            try:
+                for observation in iter_observations(response, dense=dense):
+                    yield observation
+            except Exception as e:
+                if len(parts) == 1:
+                    raise
+                self._report_failed_request(request, e)
+
+    def _set_response_format(self, kwargs):
         # there is an unfortunate difference in how 52N and ncSOS handle the response format.
         # 52N expects subtype, ncSOS expects schema.
         # consult the observed properties and getcaps to figure out which should be used if none passed
         if "responseFormat" not in kwargs:
 
             # iterate offerings and see if we need to change to subtype
-            off_dict = {off.name: off for off in self.server.offerings}
+            response_formats = self.response_formats
 
             response_format = None
 
             for offering in kwargs.get("offerings", []):
-                if offering not in off_dict:
+                if offering not in response_formats:
                     continue
 
-                ioos_formats = [
-                    rf
-                    for rf in off_dict[offering].response_formats
-                    if "ioos_sos/1.0" in rf
-                ]
-                if not len(ioos_formats):
+                if response_formats[offering] is None:
                     raise Exception(
                         "No ioos_sos/1.0 response format found for offering {}".format(
                             offering
                         )
                     )
 
-                if response_format != ioos_formats[0]:
-                    response_format = ioos_formats[0]
+                response_format = response_formats[offering]
 
             kwargs["responseFormat"] = response_format
 
-        return IoosGetObservation(self.raw(**kwargs)).observations
-
     def raw(self, **kwargs):
+        """
+        Returns the GetObservation response. When the request had to be split
+        by offering or time window (see _get_observations), the responses are
+        merged into one document, ordered by offering and then time: the
+        rows of text/csv responses are concatenated matching columns by
+        name, and the om:members of XML responses gathered into the first
+        response's ObservationCollection.
+        """
+        params, parts = self._get_observations(**kwargs)
+        responses = [response for _, response in parts]
+        if len(responses) == 1:
+            return responses[0]
+
+        if "csv" in (params.get("responseFormat") or ""):
+            return self._merge_csv(responses)
+        return self._merge_xml(responses)
+
+    def _get_observations(self, parse=None, **kwargs):
+        """
+        Makes the GetObservation request(s) for kwargs. Returns the request
+        parameters and a (request, response) pair per successful request,
+        ordered by offering and then time. With parse, each response is
+        replaced by parse(params, response), called along with its request
+        so a response that cannot be parsed fails only that request.
+
+        A request is split when the service only takes a single offering per
+        request (one request per offering) and when the time range is longer
+        than the service's window (one request per window, see
+        get_max_window). The observations of a station's windows can only be
+        merged back for text/csv, so other formats are only split by time if
+        max_window is set. The requests are made up to max_workers at a time.
+
+        Failed requests are recorded in failed_requests as (offering,
+        eventTime, exception) and reported with a warning, so one bad
+        station or window does not fail the others. If every request fails
+        the first error is raised.
+        """
+        self.failed_requests = []
+
         params = self.setup_params(**kwargs)
-        return self.server.get_observation(**params)
+
+        offerings = [None]
+        if self.single_offering and len(params.get("offerings") or []) > 1:
+            offerings = params["offerings"]
+
+        windows = [None]
+        if (
+            "csv" in (params.get("responseFormat") or "")
+            or self.max_window is not None
+        ):
+            windows = self._time_windows()
+
+        parts = []
+        for offering in offerings:
+            for window in windows:
+                request = params.copy()
+                if offering is not None:
+                    request["offerings"] = [offering]
+                if window is not None:
+                    request["eventTime"] = "%s/%s" % tuple(
+                        t.strftime("%Y-%m-%dT%H:%M:%SZ") for t in window
+                    )
+                parts.append(request)
+
+        def fetch(request):
+            response = self.server.get_observation(**request)
+            if parse is not None:
+                response = parse(params, response)
+            return response
+
+        if len(parts) == 1:
+            return params, [(parts[0], fetch(parts[0]))]
+
+        results = threaded_map(
+            fetch,
+            parts,
+            max_workers=self.max_workers,
+            return_exceptions=True,
+        )
+
+        failed = [
+            (request, result)
+            for request, result in zip(parts, results)
+            if isinstance(result, Exception)
+        ]
+        if len(failed) == len(parts):
+            self.failed_requests = [
+                self._failed_request(request, e) for request, e in failed
+            ]
+            raise failed[0][1]
+
+        for request, e in failed:
+            self._report_failed_request(request, e)
+
+        return params, [
+            (request, result)
+            for request, result in zip(parts, results)
+            if not isinstance(result, Exception)
+        ]
+
+    @staticmethod
+    def _failed_request(request, e):
+        return (
+            (request.get("offerings") or [None])[0],
+            request.get("eventTime"),
+            e,
+        )
+
+    def _report_failed_request(self, request, e):
+        """
+        Records a failed GetObservation request in failed_requests and
+        warns about it.
+        """
+        failure = self._failed_request(request, e)
+        self.failed_requests.append(failure)
+        warnings.warn(
+            "GetObservation request for {} ({}) failed: {}".format(*failure)
+        )
+
+    def get_max_window(self):
+        """
+        The longest time range requested at once: the max_window option if
+        set, otherwise the provider's default_max_window. None means the
+        range is never split.
+        """
+        if self.max_window is not None:
+            return self.max_window
+        return self.default_max_window
+
+    def _time_windows(self):
+        """
+        Splits the start_time/end_time range into consecutive windows of at
+        most get_max_window(). Each window ends a second before the next one
+        starts, so observations on a boundary are only returned once. If
+        only start_time is set the range ends now, as on the server.
+        Returns [None] if the range does not need to be split.
+        """
+        window = self.get_max_window()
+        if window is None or self.start_time is None:
+            return [None]
+
+        end_time = self.end_time
+        if end_time is None:
+            end_time = datetime.utcnow().replace(tzinfo=pytz.utc)
+
+        windows = []
+        start = self.start_time
+        while start + window < end_time:
+            windows.append((start, start + window - timedelta(seconds=1)))
+            start += window
+        windows.append((start, end_time))
+
+        return windows if len(windows) > 1 else [None]
+
+    @staticmethod
+    def _merge_csv(responses):
+        """
+        Concatenates CSV responses, matching columns by name like
+        CsvObservations. The header has every column in the order first
+        seen, columns a response does not have are left empty in its rows.
+        """
+        header = OrderedDict()
+        tables = []
+        for response in responses:
+            if isinstance(response, binary_type):
+                response = response.decode("utf-8")
+
+            reader = csv.reader(response.splitlines())
+            labels = next(reader, None)
+            if not labels:
+                continue
+
+            names = [split_header(label)[0] for label in labels]
+            for name, label in zip(names, labels):
+                header.setdefault(name, label)
+            tables.append((names, [row for row in reader if row]))
+
+        merged = StringIO()
+        writer = csv.writer(merged, lineterminator="\n")
+        writer.writerow(list(header.values()))
+        for names, rows in tables:
+            index = dict((name, i) for i, name in enumerate(names))
+            columns = [index.get(name) for name in header]
+            writer.writerows(
+                [
+                    row[i] if i is not None and i < len(row) else ""
+                    for i in columns
+                ]
+                for row in rows
+            )
+
+        merged = merged.getvalue()
+        if isinstance(responses[0], binary_type):
+            merged = merged.encode("utf-8")
+        return merged
+
+    @staticmethod
+    def _merge_xml(responses):
+        """
+        Moves the om:members of every response into the ObservationCollection
+        of the first one and returns it serialized.
+        """
+        member_tag = "{%s}member" % Namespaces().get_namespace("om10")
+        roots = [parse_root(r, huge_tree=True) for r in responses]
+        for root in roots[1:]:
+            roots[0].extend(root.findall(member_tag))
+        return etree.tostring(roots[0])
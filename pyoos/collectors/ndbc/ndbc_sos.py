@@ -1,11 +1,17 @@
 from __future__ import absolute_import, division, print_function
 
+from datetime import timedelta
+
 from six import string_types, text_type
 
 from pyoos.collectors.ioos.swe_sos import IoosSweSos
 
 
 class NdbcSos(IoosSweSos):
+    single_offering = True
+    # NDBC returns at most about a month of data per request
+    default_max_window = timedelta(days=30)
+
     def __init__(self, **kwargs):
         if kwargs.get("test", None) is True:
             kwargs["url"] = "http://sdftest.ndbc.noaa.gov/sos/server.php"
@@ -26,15 +32,11 @@ class NdbcSos(IoosSweSos):
 
         if self.features is None or len(self.features) < 1:
             params["offerings"] = ["urn:ioos:network:noaa.nws.ndbc:all"]
-        elif len(self.features) > 1:
-            # TODO: Send many requests, one for each station, rather than a network:all
-            print(
-                "NDBC does not support filtering by > 1 station at a time... returning all stations."
-            )
-            params["offerings"] = ["urn:ioos:network:noaa.nws.ndbc:all"]
-        elif len(self.features) == 1:
+        else:
+            # NDBC takes one station per request, so several stations are
+            # requested concurrently and merged (see single_offering)
             params["offerings"] = [
-                "urn:ioos:station:wmo:%s" % self.features[0]
+                "urn:ioos:station:wmo:%s" % f for f in self.features
             ]
 
         if params.get("responseFormat", None) is None:
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, division, print_function
 
-import requests
+import hashlib
+
 from owslib.util import testXMLValue
 from shapely.geometry import Point, box
 
@@ -14,7 +15,7 @@ class NerrsSoap(Collector):
         """
         :param wildcard: string for optional token-based access mechanism.
         """
-        super(NerrsSoap, self).__init__()
+        super(NerrsSoap, self).__init__(**kwargs)
         self.wsdl_url = (
             "http://cdmo.baruch.sc.edu/webservices2/requests.cfc?wsdl"
         )
@@ -27,6 +28,14 @@ class NerrsSoap(Collector):
                 return s
 
     def get_stations(self):
+        endpoint = self.wsdl_url
+        if self.wildcard is not None:
+            # don't keep the access token itself in the cache
+            token = hashlib.sha1(self.wildcard.encode("utf-8")).hexdigest()
+            endpoint += "#wildcard=" + token
+        return self._get_catalog(endpoint, self._fetch_stations)
+
+    def _fetch_stations(self):
         if self.wildcard is not None:
             xml_str = """
             <exportStationCodesXMLNew xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
@@ -76,7 +85,7 @@ class NerrsSoap(Collector):
         body.append(xmlelement)
 
         headers = {"SOAPAction": '""'}
-        r = requests.post(
+        r = self.session.post(
             self.wsdl_url, data=etree.tostring(enve), headers=headers
         )
         return etree.fromstring(r.text[38:]).find(".//returnData")
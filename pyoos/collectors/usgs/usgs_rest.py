@@ -1,6 +1,5 @@
 from __future__ import absolute_import, division, print_function
 
-import requests
 from six import string_types
 
 from pyoos.collectors.collector import Collector
@@ -9,7 +8,7 @@ from pyoos.parsers.waterml import WaterML11ToPaegan
 
 class UsgsRest(Collector):
     def __init__(self, **kwargs):
-        super(UsgsRest, self).__init__()
+        super(UsgsRest, self).__init__(**kwargs)
         self.rest_url = "http://waterservices.usgs.gov/nwis/iv"
         self._state = None
 
@@ -68,9 +67,9 @@ class UsgsRest(Collector):
 
     def collect(self):
         params = self.setup_params()
-        data = requests.get(self.rest_url, params=params).text
+        data = self.session.get(self.rest_url, params=params).text
         return WaterML11ToPaegan(data).feature
 
     def raw(self, **kwargs):
         params = self.setup_params()
-        return requests.get(self.rest_url, params=params).text
+        return self.session.get(self.rest_url, params=params).text
@@ -1,7 +1,5 @@
 from __future__ import absolute_import, division, print_function
 
-import requests
-
 from pyoos.collectors.collector import Collector
 from pyoos.parsers.wqx.wqx_outbound import WqxToPaegan
 from pyoos.utils.etree import etree
@@ -9,7 +7,7 @@ from pyoos.utils.etree import etree
 
 class WqpRest(Collector):
     def __init__(self, **kwargs):
-        super(WqpRest, self).__init__()
+        super(WqpRest, self).__init__(**kwargs)
         self.sites_url = kwargs.get(
             "sites_url", "http://www.waterqualitydata.us/Station/search"
         )
@@ -27,17 +25,17 @@ class WqpRest(Collector):
 
     def get_characterisic_types(self, **kwargs):
         root = etree.fromstring(
-            requests.get(self.characteristic_types_url).text
+            self.session.get(self.characteristic_types_url).text
         )
         return (x.get("value") for x in root.findall("Code"))
 
     def get_raw_sites_data(self, **kwargs):
         params = self.setup_params(**kwargs)
-        return requests.get(self.sites_url, params=params).text
+        return self.session.get(self.sites_url, params=params).text
 
     def get_raw_results_data(self, **kwargs):
         params = self.setup_params(**kwargs)
-        return requests.get(self.results_url, params=params).text
+        return self.session.get(self.results_url, params=params).text
 
     def set_features(self, features):
         super(WqpRest, self).set_features(features)
@@ -53,7 +51,9 @@ class WqpRest(Collector):
     features = property(get_features, set_features)
 
     def list_variables(self):
-        root = etree.fromstring(requests.get(self.characteristics_url).text)
+        root = etree.fromstring(
+            self.session.get(self.characteristics_url).text
+        )
         return (x.get("value") for x in root.findall("Code"))
 
     def list_features(self):
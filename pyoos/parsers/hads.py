@@ -1,17 +1,161 @@
 from __future__ import absolute_import, division, print_function
 
-import time
 from collections import defaultdict
-from itertools import groupby
+from datetime import datetime
 
+import numpy as np
 import pytz
-from dateutil.parser import parser
 from numpy import nan as npNan
 from paegan.cdm.dsg.collections.station_collection import StationCollection
 from paegan.cdm.dsg.features.base.point import Point
 from paegan.cdm.dsg.features.station import Station
 from paegan.cdm.dsg.member import Member
 from shapely.geometry import Point as sPoint
+from six import string_types
+
+from pyoos.utils.asatime import AsaTime
+
+
+def _to_datetime64(dt):
+    """
+    Converts a (possibly timezone aware) datetime into a naive UTC datetime64.
+    """
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(pytz.utc).replace(tzinfo=None)
+    return np.datetime64(dt, "s")
+
+
+# HADS PE code -> (mmi name, units, english name, english description)
+_PE_CODES = {
+    "UR": (
+        "wind_gust_from_direction",
+        "degrees from N",
+        "Wind Gust from Direction",
+        "Direction from which wind gust is blowing when maximum wind speed is observed.  Meteorological Convention. Wind is motion of air relative to the surface of the earth.",
+    ),
+    "VJA": ("air_temperature_maximum", "f", "Air Temperature Maximum", ""),
+    "TX": ("air_temperature_maximum", "f", "Air Temperature Maximum", ""),
+    "VJB": ("air_temperature_minimum", "f", "Air Temperature Minumum", ""),
+    "TN": ("air_temperature_minimum", "f", "Air Temperature Minumum", ""),
+    # PC2?
+    "PC": (
+        "precipitation_accumulated",
+        "in",
+        "Precipitation Accumulated",
+        "Amount of liquid equivalent precipitation accumulated or totaled for a defined period of time, usually hourly, daily, or annually.",
+    ),
+    "PP": (
+        "precipitation_rate",
+        "in",
+        "Precipitation Rate",
+        "Amount of wet equivalent precipitation per unit time.",
+    ),
+    "US": (
+        "wind_speed",
+        "mph",
+        "Wind Speed",
+        "Magnitude of wind velocity. Wind is motion of air relative to the surface of the earth.",
+    ),
+    "UD": (
+        "wind_from_direction",
+        "degrees_true",
+        "Wind from Direction",
+        "Direction from which wind is blowing.  Meteorological Convention. Wind is motion of air relative to the surface of the earth.",
+    ),
+    "UP": (
+        "wind_gust",
+        "mph",
+        "Wind Gust Speed",
+        "Maximum instantaneous wind speed (usually no more than but not limited to 10 seconds) within a sample averaging interval. Wind is motion of air relative to the surface of the earth.",
+    ),
+    "UG": (
+        "wind_gust",
+        "mph",
+        "Wind Gust Speed",
+        "Maximum instantaneous wind speed (usually no more than but not limited to 10 seconds) within a sample averaging interval. Wind is motion of air relative to the surface of the earth.",
+    ),
+    "VUP": (
+        "wind_gust",
+        "mph",
+        "Wind Gust Speed",
+        "Maximum instantaneous wind speed (usually no more than but not limited to 10 seconds) within a sample averaging interval. Wind is motion of air relative to the surface of the earth.",
+    ),
+    "TA": (
+        "air_temperature",
+        "f",
+        "Air Temperature",
+        "Air temperature is the bulk temperature of the air, not the surface (skin) temperature.",
+    ),
+    "TA2": (
+        "air_temperature",
+        "f",
+        "Air Temperature",
+        "Air temperature is the bulk temperature of the air, not the surface (skin) temperature.",
+    ),
+    "MT": ("fuel_temperature", "f", "Fuel Temperature", ""),
+    "XR": ("relative_humidity", "percent", "Relative Humidity", ""),
+    "VB": ("battery_voltage", "voltage", "Battery Voltage", ""),
+    "MM": ("fuel_moisture", "percent", "Fuel Moisture", ""),
+    "RW": ("solar_radiation", "watt/m^2", "Solar Radiation", ""),
+    "RS": (
+        "photosynthetically_active_radiation",
+        "watt/m^2",
+        "Photosynthetically Active Radiation",
+        "",
+    ),
+    # TW2?
+    "TW": (
+        "sea_water_temperature",
+        "f",
+        "Sea Water Temperature",
+        "Sea water temperature is the in situ temperature of the sea water.",
+    ),
+    "WT": ("turbidity", "nephelometric turbidity units", "Turbidity", ""),
+    "WC": (
+        "sea_water_electrical_conductivity",
+        "micro mhos/cm",
+        "Sea Water Electrical Conductivity",
+        "",
+    ),
+    "WP": (
+        "sea_water_ph_reported_on_total_scale",
+        "std units",
+        "Sea Water PH reported on Total Scale",
+        "the measure of acidity of seawater",
+    ),
+    "WO": ("dissolved_oxygen", "ppm", "Dissolved Oxygen", ""),
+    "WX": (
+        "dissolved_oxygen_saturation",
+        "percent",
+        "Dissolved Oxygen Saturation",
+        "",
+    ),
+    "TD": (
+        "dew_point_temperature",
+        "f",
+        "Dew Point Temperature",
+        "the temperature at which a parcel of air reaches saturation upon being cooled at constant pressure and specific humidity.",
+    ),
+    # HG2?
+    "HG": ("stream_gage_height", "ft", "Stream Gage Height", ""),
+    "HP": (
+        "water_surface_height_above_reference_datum",
+        "ft",
+        "Water Surface Height Above Reference Datum",
+        "means the height of the upper surface of a body of liquid water, such as sea, lake or river, above an arbitrary reference datum.",
+    ),
+    "WS": ("salinity", "ppt", "Salinity", ""),
+    "HM": ("water_level", "ft", "Water Level", ""),
+    "PA": ("air_pressure", "hp", "Air Pressure", ""),
+    "SD": ("snow_depth", "in", "Snow Depth", ""),
+    "SW": ("snow_water_equivalent", "m", "Snow Water Equivalent", ""),
+    "TS": (
+        "soil_temperature",
+        "f",
+        "Soil Temperature",
+        "Soil temperature is the bulk temperature of the soil, not the surface (skin) temperature.",
+    ),
+}
 
 
 class HadsParser(object):
@@ -21,7 +165,9 @@ class HadsParser(object):
     def parse(self, metadata, raw_data, var_filter, time_extents):
 
         self.parsed_metadata = self._parse_metadata(metadata)
-        self.parsed_data = self._parse_data(raw_data, var_filter, time_extents)
+        self.parsed_data = self._parse_data(
+            raw_data, var_filter, time_extents, columnar=True
+        )
         self.feature = self._build_station_collection(
             self.parsed_metadata, self.parsed_data
         )
@@ -29,6 +175,64 @@ class HadsParser(object):
         return self.feature
 
     def _build_station_collection(self, parsed_metadata, parsed_data):
+        """
+        Builds a StationCollection from parsed metadata and columnar parsed
+        data (see _parse_data).
+
+        All observations are sorted once on (station, z, time) and every run
+        of equal keys becomes a single Point.
+        """
+        codes, code_idx = np.unique(
+            parsed_data["station"], return_inverse=True
+        )
+        pe_codes, pe_idx = np.unique(
+            parsed_data["pe_code"], return_inverse=True
+        )
+
+        # resolve PE codes and base elevations once per distinct value
+        pe_info = [self.get_variable_info(pe) for pe in pe_codes.tolist()]
+        base_elevation = np.full((len(codes), len(pe_codes)), np.nan)
+        for i, code in enumerate(codes.tolist()):
+            variables = parsed_metadata.get(code, {}).get("variables", {})
+            for j, pe in enumerate(pe_codes.tolist()):
+                if pe in variables:
+                    base_elevation[i, j] = variables[pe]["base_elevation"]
+
+        known = np.array([info is not None for info in pe_info], dtype=bool)
+        for i, j in set(zip(code_idx[~known[pe_idx]], pe_idx[~known[pe_idx]])):
+            print(
+                "Unknown PE Code, ignoring: {} (station: {}).".format(
+                    pe_codes[j], codes[i]
+                )
+            )
+
+        z = base_elevation[code_idx, pe_idx]
+        keep = known[pe_idx] & ~np.isnan(z)
+        code_idx, pe_idx, z = code_idx[keep], pe_idx[keep], z[keep]
+        epochs = (
+            parsed_data["time"][keep].astype("datetime64[s]").astype(np.int64)
+        )
+        values = parsed_data["value"][keep].tolist()
+
+        order = np.lexsort((epochs, z, code_idx))
+        code_idx, pe_idx = code_idx[order], pe_idx[order]
+        z, epochs = z[order], epochs[order]
+        values = [values[k] for k in order]
+
+        # start offsets of each (station, z, time) group
+        breaks = np.flatnonzero(
+            (np.diff(code_idx) != 0)
+            | (np.diff(z) != 0)
+            | (np.diff(epochs) != 0)
+        )
+        starts = np.concatenate(([0], breaks + 1)).astype(np.int64)
+        ends = np.concatenate((starts[1:], [len(order)])).astype(np.int64)
+
+        station_groups = defaultdict(list)
+        if len(order):
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                station_groups[codes[code_idx[start]]].append((start, end))
+        pe_idx, z, epochs = pe_idx.tolist(), z.tolist(), epochs.tolist()
 
         stations = []
         for station_code, station_metadata in parsed_metadata.items():
@@ -55,64 +259,21 @@ class HadsParser(object):
 
             stations.append(s)
 
-            # data
-
             # possibility no data for this station, or vars filtered all out
-            if station_code not in parsed_data:
-                continue
-
-            # need to group into distinct time/z value pairs
-
-            # create a keyfunc (creates string of <z>-<timestamp>)
-            zandtime = (
-                lambda x: str(x[3]) + "-" + str(time.mktime(x[1].timetuple()))
-            )
-
-            # annotate data with z values, sort, group by keyfunc (z/time)
-            grouped_data = groupby(
-                sorted(
-                    (
-                        (
-                            x[0],
-                            x[1],
-                            x[2],
-                            parsed_metadata[station_code]["variables"][x[0]][
-                                "base_elevation"
-                            ],
-                        )
-                        for x in parsed_data[station_code]
-                    ),
-                    key=zandtime,
-                ),
-                zandtime,
-            )
-
-            for _, group in grouped_data:
-
-                # group is an iterator, turn it into a list (it will have at least one item)
-                groupvals = list(group)
-
+            for start, end in station_groups.get(station_code, []):
                 p = Point()
-                p.time = groupvals[0][1]
+                p.time = datetime.fromtimestamp(epochs[start], pytz.utc)
                 p.location = sPoint(
                     station_metadata["longitude"],
                     station_metadata["latitude"],
-                    groupvals[0][3],
+                    z[start],
                 )
 
-                for val in groupvals:
-                    std_var = self.get_variable_info(val[0])
-                    if std_var is None:
-                        print(
-                            "Unknown PE Code, ignoring: {} (station: {}).".format(
-                                val[0], station_code
-                            )
-                        )
-                        continue
-
+                for k in range(start, end):
+                    std_var = pe_info[pe_idx[k]]
                     p.add_member(
                         Member(
-                            value=val[2],
+                            value=values[k],
                             standard=std_var[0],
                             unit=std_var[1],
                             name=std_var[2],
@@ -124,38 +285,102 @@ class HadsParser(object):
 
         return StationCollection(elements=stations)
 
-    def _parse_data(self, raw_data, var_filter, time_extents):
+    def _parse_data(self, raw_data, var_filter, time_extents, columnar=False):
         """
         Transforms raw HADS observations into a dict:
             station code -> [(variable, time, value), ...]
 
+        If columnar is True, returns a dict of equal length NumPy arrays
+        instead:
+            {"station": str, "pe_code": str, "time": datetime64[s], "value": float64}
+
         Takes into account the var filter (if set).
         """
+        columns = self._parse_data_columns(raw_data, var_filter, time_extents)
+        if columnar:
+            return columns
 
         retval = defaultdict(list)
-        p = parser()
+        for station, pe_code, dt, value in zip(
+            columns["station"].tolist(),
+            columns["pe_code"].tolist(),
+            columns["time"].astype(object),
+            columns["value"].tolist(),
+        ):
+            retval[station].append(
+                (pe_code, dt.replace(tzinfo=pytz.utc), value)
+            )
 
-        begin_time, end_time = time_extents
+        return dict(retval)
 
-        for line in raw_data.splitlines():
-            if len(line) == 0:
+    def _parse_data_columns(self, raw_data, var_filter, time_extents):
+        """
+        Splits the raw HADS observations (a string or an iterable of lines)
+        into columns in a single pass, dropping filtered out variables as it
+        goes, and applies the time extents as a vectorized mask.
+        """
+        if isinstance(raw_data, string_types):
+            raw_data = raw_data.splitlines()
+        if var_filter is not None:
+            var_filter = set(var_filter)
+
+        cols = ([], [], [], [])
+        for line in raw_data:
+            if not line:
                 continue
 
-            fields = line.split("|")[0:-1]
+            fields = line.split("|", 5)
             if var_filter is None or fields[2] in var_filter:
-                dt = p.parse(fields[3]).replace(tzinfo=pytz.utc)
-                if (begin_time is None or dt >= begin_time) and (
-                    end_time is None or dt <= end_time
-                ):
-                    try:
-                        value = (
-                            float(fields[4]) if fields[4] != "NaN" else npNan
-                        )
-                    except ValueError:
-                        value = npNan
-                    retval[fields[0]].append((fields[2], dt, value))
+                cols[0].append(fields[0])
+                cols[1].append(fields[2])
+                cols[2].append(fields[3])
+                cols[3].append(fields[4])
 
-        return dict(retval)
+        stations = np.array(cols[0], dtype=str)
+        pe_codes = np.array(cols[1], dtype=str)
+        times = self._parse_times(np.array(cols[2], dtype=str))
+        values = self._parse_values(np.array(cols[3], dtype=str))
+        del cols
+
+        begin_time, end_time = time_extents
+        mask = np.ones(len(times), dtype=bool)
+        if begin_time is not None:
+            mask &= times >= _to_datetime64(begin_time)
+        if end_time is not None:
+            mask &= times <= _to_datetime64(end_time)
+
+        return {
+            "station": stations[mask],
+            "pe_code": pe_codes[mask],
+            "time": times[mask],
+            "value": values[mask],
+        }
+
+    @staticmethod
+    def _parse_times(raw_times):
+        """
+        Parses a column of HADS timestamps (YYYY-MM-DD HH:MM, UTC).
+        """
+        return AsaTime.parse_column(raw_times)
+
+    @staticmethod
+    def _parse_values(raw_values):
+        """
+        Parses a column of HADS values, unparseable values become NaN.
+        """
+        try:
+            return raw_values.astype(np.float64)
+        except ValueError:
+
+            def to_float(v):
+                try:
+                    return float(v)
+                except ValueError:
+                    return npNan
+
+            return np.array(
+                [to_float(v) for v in raw_values], dtype=np.float64
+            )
 
     def _parse_metadata(self, metadata):
         """
@@ -250,155 +475,4 @@ class HadsParser(object):
         """
         Returns a tuple of (mmi name, units, english name, english description) or None.
         """
-        if hads_var_name == "UR":
-            return (
-                "wind_gust_from_direction",
-                "degrees from N",
-                "Wind Gust from Direction",
-                "Direction from which wind gust is blowing when maximum wind speed is observed.  Meteorological Convention. Wind is motion of air relative to the surface of the earth.",
-            )
-        elif hads_var_name in ["VJA", "TX"]:
-            return (
-                "air_temperature_maximum",
-                "f",
-                "Air Temperature Maximum",
-                "",
-            )
-        elif hads_var_name in ["VJB", "TN"]:
-            return (
-                "air_temperature_minimum",
-                "f",
-                "Air Temperature Minumum",
-                "",
-            )
-        elif hads_var_name == "PC":  # PC2?
-            return (
-                "precipitation_accumulated",
-                "in",
-                "Precipitation Accumulated",
-                "Amount of liquid equivalent precipitation accumulated or totaled for a defined period of time, usually hourly, daily, or annually.",
-            )
-        elif hads_var_name == "PP":
-            return (
-                "precipitation_rate",
-                "in",
-                "Precipitation Rate",
-                "Amount of wet equivalent precipitation per unit time.",
-            )
-        elif hads_var_name == "US":
-            return (
-                "wind_speed",
-                "mph",
-                "Wind Speed",
-                "Magnitude of wind velocity. Wind is motion of air relative to the surface of the earth.",
-            )
-        elif hads_var_name == "UD":
-            return (
-                "wind_from_direction",
-                "degrees_true",
-                "Wind from Direction",
-                "Direction from which wind is blowing.  Meteorological Convention. Wind is motion of air relative to the surface of the earth.",
-            )
-        elif hads_var_name in ["UP", "UG", "VUP"]:
-            return (
-                "wind_gust",
-                "mph",
-                "Wind Gust Speed",
-                "Maximum instantaneous wind speed (usually no more than but not limited to 10 seconds) within a sample averaging interval. Wind is motion of air relative to the surface of the earth.",
-            )
-        elif hads_var_name in ["TA", "TA2"]:
-            return (
-                "air_temperature",
-                "f",
-                "Air Temperature",
-                "Air temperature is the bulk temperature of the air, not the surface (skin) temperature.",
-            )
-        elif hads_var_name == "MT":
-            return ("fuel_temperature", "f", "Fuel Temperature", "")
-        elif hads_var_name == "XR":
-            return ("relative_humidity", "percent", "Relative Humidity", "")
-        elif hads_var_name == "VB":
-            return ("battery_voltage", "voltage", "Battery Voltage", "")
-        elif hads_var_name == "MM":
-            return ("fuel_moisture", "percent", "Fuel Moisture", "")
-        elif hads_var_name == "RW":
-            return ("solar_radiation", "watt/m^2", "Solar Radiation", "")
-        elif hads_var_name == "RS":
-            return (
-                "photosynthetically_active_radiation",
-                "watt/m^2",
-                "Photosynthetically Active Radiation",
-                "",
-            )
-        elif hads_var_name == "TW":  # TW2?
-            return (
-                "sea_water_temperature",
-                "f",
-                "Sea Water Temperature",
-                "Sea water temperature is the in situ temperature of the sea water.",
-            )
-        elif hads_var_name == "WT":
-            return (
-                "turbidity",
-                "nephelometric turbidity units",
-                "Turbidity",
-                "",
-            )
-        elif hads_var_name == "WC":
-            return (
-                "sea_water_electrical_conductivity",
-                "micro mhos/cm",
-                "Sea Water Electrical Conductivity",
-                "",
-            )
-        elif hads_var_name == "WP":
-            return (
-                "sea_water_ph_reported_on_total_scale",
-                "std units",
-                "Sea Water PH reported on Total Scale",
-                "the measure of acidity of seawater",
-            )
-        elif hads_var_name == "WO":
-            return ("dissolved_oxygen", "ppm", "Dissolved Oxygen", "")
-        elif hads_var_name == "WX":
-            return (
-                "dissolved_oxygen_saturation",
-                "percent",
-                "Dissolved Oxygen Saturation",
-                "",
-            )
-        elif hads_var_name == "TD":
-            return (
-                "dew_point_temperature",
-                "f",
-                "Dew Point Temperature",
-                "the temperature at which a parcel of air reaches saturation upon being cooled at constant pressure and specific humidity.",
-            )
-        elif hads_var_name == "HG":  # HG2?
-            return ("stream_gage_height", "ft", "Stream Gage Height", "")
-        elif hads_var_name == "HP":
-            return (
-                "water_surface_height_above_reference_datum",
-                "ft",
-                "Water Surface Height Above Reference Datum",
-                "means the height of the upper surface of a body of liquid water, such as sea, lake or river, above an arbitrary reference datum.",
-            )
-        elif hads_var_name == "WS":
-            return ("salinity", "ppt", "Salinity", "")
-        elif hads_var_name == "HM":
-            return ("water_level", "ft", "Water Level", "")
-        elif hads_var_name == "PA":
-            return ("air_pressure", "hp", "Air Pressure", "")
-        elif hads_var_name == "SD":
-            return ("snow_depth", "in", "Snow Depth", "")
-        elif hads_var_name == "SW":
-            return ("snow_water_equivalent", "m", "Snow Water Equivalent", "")
-        elif hads_var_name == "TS":
-            return (
-                "soil_temperature",
-                "f",
-                "Soil Temperature",
-                "Soil temperature is the bulk temperature of the soil, not the surface (skin) temperature.",
-            )
-
-        return None
+        return _PE_CODES.get(hads_var_name)
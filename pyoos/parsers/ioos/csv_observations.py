@@ -0,0 +1,108 @@
+from __future__ import absolute_import, division, print_function
+
+import csv
+import re
+from collections import OrderedDict
+
+import numpy as np
+from six import binary_type, text_type
+
+from pyoos.utils.asatime import AsaTime
+
+# "air_pressure_at_sea_level (hPa)" -> name, units
+HEADER_RE = re.compile(r"^(?P<name>.*?)\s*\((?P<units>[^()]*)\)$")
+
+# Columns that are always kept as text
+TEXT_COLUMNS = ("station_id", "sensor_id")
+
+
+def split_header(header):
+    """
+    Splits a column header into its name and units (None if it has none):
+    "air_pressure_at_sea_level (hPa)" -> ("air_pressure_at_sea_level", "hPa")
+    """
+    header = header.strip()
+    match = HEADER_RE.match(header)
+    if match:
+        return match.group("name"), match.group("units")
+    return header, None
+
+
+class CsvObservations(object):
+    """
+    Decodes the text/csv GetObservation responses of the NDBC and CO-OPS SOS
+    servers into per-column NumPy arrays.
+
+    self.columns maps each column name (without units) to an array:
+    date_time is datetime64, station_id/sensor_id and any other column
+    that is not numeric are strings, everything else is float64 with NaN
+    for missing values. self.units maps column names to the units given in
+    the header, or None.
+
+    :param responses: a response (bytes/text) or a list of them, e.g. one
+                      per station. Their rows are concatenated in the
+                      order given, matching columns by name, so rows are
+                      not sorted on date_time across responses.
+    """
+
+    def __init__(self, responses):
+        if isinstance(responses, (binary_type, text_type)):
+            responses = [responses]
+
+        self.units = OrderedDict()
+        raw = OrderedDict()
+        size = 0
+
+        for response in responses:
+            if isinstance(response, binary_type):
+                response = response.decode("utf-8")
+
+            reader = csv.reader(response.splitlines())
+            header = next(reader, None)
+            if not header:
+                continue
+
+            names = []
+            for h in header:
+                name, units = split_header(h)
+                if name not in raw:
+                    # Columns first seen in a later response are empty
+                    # for the rows before it
+                    raw[name] = [""] * size
+                    self.units[name] = units
+                names.append(name)
+
+            rows = [row for row in reader if row]
+            for i, name in enumerate(names):
+                raw[name].extend(
+                    row[i] if i < len(row) else "" for row in rows
+                )
+            size += len(rows)
+
+            # Pad columns this response does not have
+            for values in raw.values():
+                values.extend([""] * (size - len(values)))
+
+        self.size = size
+        self.columns = OrderedDict(
+            (name, self._decode_column(name, values))
+            for name, values in raw.items()
+        )
+
+    @staticmethod
+    def _decode_column(name, values):
+        strings = np.array(values, dtype=np.str_)
+        if name == "date_time":
+            times = np.full(len(strings), np.datetime64("NaT"), "M8[s]")
+            present = strings != ""
+            times[present] = AsaTime.parse_column(strings[present])
+            return times
+
+        if name in TEXT_COLUMNS:
+            return strings
+
+        try:
+            return np.where(strings == "", "nan", strings).astype(np.float64)
+        except ValueError:
+            # Not a numeric column
+            return strings
@@ -1,22 +1,46 @@
 from __future__ import absolute_import, division, print_function
 
+from io import BytesIO
+
 from owslib.namespaces import Namespaces
-from owslib.util import testXMLValue
+from owslib.util import testXMLAttribute, testXMLValue
+from six import binary_type, text_type
 
-from pyoos.utils.etree import ElementType, etree
+from pyoos.utils.etree import (
+    HUGE_TREE,
+    etree,
+    get_root,
+    new_with_root,
+    parse_root,
+)
 
 ns = Namespaces()
 
 
-class IoosGetObservation(object):
-    def __new__(cls, element):
-        if isinstance(element, ElementType):
-            root = element
-        else:
-            root = etree.fromstring(element)
+def _is_trajectory(observation):
+    """
+    True if the om:Observation element is of a trajectory or
+    trajectoryProfile feature type. NDBC serves those (glider data) without
+    an ioosTemplateVersion, but in the layout of the 1.0 templates.
+    """
+    if observation is None:
+        return False
 
-        if hasattr(root, "getroot"):
-            root = root.getroot()
+    OM_NS = ns.get_namespace("om10")
+    GML_NS = ns.get_versioned_namespace("gml", "3.1.1")
+    names = observation.findall(
+        "{%s}featureOfInterest/{%s}FeatureCollection/{%s}metaDataProperty//{%s}name"
+        % (OM_NS, GML_NS, GML_NS, GML_NS)
+    )
+    return any(
+        testXMLValue(name) in ("trajectory", "trajectoryProfile")
+        for name in names
+    )
+
+
+class IoosGetObservation(object):
+    def __new__(cls, element, dense=False):
+        root = parse_root(element, huge_tree=True)
 
         XLINK_NS = ns.get_namespace("xlink")
         GML_NS = [ns.get_versioned_namespace("gml", "3.1.1")]
@@ -33,12 +57,19 @@ class IoosGetObservation(object):
             except Exception:
                 continue
 
+        if version is None:
+            OM_NS = ns.get_namespace("om10")
+            if _is_trajectory(
+                root.find("{%s}member/{%s}Observation" % (OM_NS, OM_NS))
+            ):
+                version = "1.0"
+
         if version == "1.0":
             from pyoos.parsers.ioos.one.get_observation import (
                 GetObservation as GO10,
             )
 
-            return super(IoosGetObservation, cls).__new__(GO10)
+            return new_with_root(GO10, root)
         else:
             raise ValueError(
                 "Unsupported IOOS version {}.  Supported: [1.0]".format(
@@ -46,14 +77,80 @@ class IoosGetObservation(object):
                 )
             )
 
-    def __init__(self, element):
+    def __init__(self, element, dense=False):
         # Get individual om:Observations has a hash or name:ob.
-        if isinstance(element, ElementType):
-            self._root = element
-        else:
-            self._root = etree.fromstring(element)
-
-        if hasattr(self._root, "getroot"):
-            self._root = self._root.getroot()
+        self._root = get_root(self, element, huge_tree=True)
 
         self.observations = []
+
+
+def iter_observations(source, dense=False):
+    """
+    Parses an IOOS GetObservation response incrementally, yielding its
+    om:Observations one at a time so the whole document never has to be
+    held as a tree.
+
+    source can be the response as bytes/text or a file-like object. Every
+    om:member is detached from the document once its observation has been
+    built, so memory use is bounded by the largest single observation.
+    """
+    if isinstance(source, text_type):
+        source = source.encode("utf-8")
+    if isinstance(source, binary_type):
+        source = BytesIO(source)
+
+    OM_NS = ns.get_namespace("om10")
+    GML_NS = ns.get_versioned_namespace("gml", "3.1.1")
+    XLINK_NS = ns.get_namespace("xlink")
+
+    member_tag = "{%s}member" % OM_NS
+    observation_tag = "{%s}Observation" % OM_NS
+    metadata_tag = "{%s}metaDataProperty" % GML_NS
+    title_attr = "{%s}title" % XLINK_NS
+
+    root = None
+    version = None
+    observation_cls = None
+    depth = 0
+
+    for event, element in etree.iterparse(
+        source, events=("start", "end"), **HUGE_TREE
+    ):
+        if event == "start":
+            if root is None:
+                root = element
+            depth += 1
+            continue
+
+        depth -= 1
+        # Only direct children of the ObservationCollection are of interest
+        if depth != 1:
+            continue
+
+        if (
+            element.tag == metadata_tag
+            and testXMLAttribute(element, title_attr) == "ioosTemplateVersion"
+        ):
+            version = testXMLValue(element.find("{%s}version" % GML_NS))
+
+        elif element.tag == member_tag:
+            if observation_cls is None:
+                if version is None and _is_trajectory(
+                    element.find(observation_tag)
+                ):
+                    version = "1.0"
+                if version == "1.0":
+                    from pyoos.parsers.ioos.one.get_observation import (
+                        OmObservation as observation_cls,
+                    )
+                else:
+                    raise ValueError(
+                        "Unsupported IOOS version {}.  Supported: [1.0]".format(
+                            version
+                        )
+                    )
+
+            root.remove(element)
+            ob = element.find(observation_tag)
+            if ob is not None:
+                yield observation_cls(ob, dense=dense)
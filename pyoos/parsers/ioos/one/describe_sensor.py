@@ -3,13 +3,14 @@ from __future__ import absolute_import, division, print_function
 import itertools
 import warnings
 
-from dateutil import parser
 from owslib.namespaces import Namespaces
 from owslib.swe.sensor.sml import SensorML
-from owslib.util import nspath_eval, testXMLAttribute, testXMLValue
+from owslib.util import testXMLAttribute, testXMLValue
 
 from pyoos.parsers.ioos.describe_sensor import IoosDescribeSensor
-from pyoos.utils import ElementType, etree
+from pyoos.utils.asatime import AsaTime
+from pyoos.utils.etree import get_root
+from pyoos.utils.xpath import XPathRegistry
 
 try:
     from urlparse import urljoin
@@ -28,8 +29,14 @@ SML_NS = namespaces["sml101"]
 ont = "http://mmisw.org/ont/ioos/definition/"
 
 
-def nsp(path):
-    return nspath_eval(path, namespaces)
+xpaths = XPathRegistry(
+    namespaces,
+    [
+        ".//swe101:field[@name='ioosTemplateVersion']/swe101:Text/swe101:value",
+        ".//swe101:TimeRange/swe101:value",
+        ".//swe101:Quantity",
+    ],
+)
 
 
 class DescribeSensor(IoosDescribeSensor):
@@ -61,22 +68,16 @@ class DescribeSensor(IoosDescribeSensor):
 
     def __init__(self, element):
         """ Common things between all describe sensor requests """
-        if isinstance(element, ElementType):
-            root = element
-        else:
-            root = etree.fromstring(element)
+        root = self._root = get_root(self, element)
 
         # sml_str = ".//{{{0}}}identifier/{{{0}}}Term[@definition='http://mmisw.org/ont/ioos/definition/%s']".format(SML_NS)
 
-        # TODO: make this cleaner
-        if hasattr(root, "getroot"):
-            root = root.getroot()
-        self.system = SensorML(element).members[0]
+        self.system = SensorML(root).members[0]
 
         self.ioos_version = testXMLValue(
-            root.find(
-                ".//{%s}field[@name='ioosTemplateVersion']/{%s}Text/{%s}value"
-                % (SWE_NS, SWE_NS, SWE_NS)
+            xpaths.find(
+                root,
+                ".//swe101:field[@name='ioosTemplateVersion']/swe101:Text/swe101:value",
             )
         )
         if self.ioos_version != "1.0":
@@ -98,12 +99,15 @@ class DescribeSensor(IoosDescribeSensor):
         # Timerange
         try:
             timerange = testXMLValue(
-                self.system.get_capabilities_by_name("observationTimeRange")[
-                    0
-                ].find(".//" + nsp("swe101:TimeRange/swe101:value"))
+                xpaths.find(
+                    self.system.get_capabilities_by_name(
+                        "observationTimeRange"
+                    )[0],
+                    ".//swe101:TimeRange/swe101:value",
+                )
             ).split(" ")
-            self.starting = parser.parse(timerange[0])
-            self.ending = parser.parse(timerange[1])
+            self.starting = AsaTime.parse(timerange[0])
+            self.ending = AsaTime.parse(timerange[1])
         except (AttributeError, TypeError, ValueError, IndexError):
             self.starting = None
             self.ending = None
@@ -181,8 +185,8 @@ class StationDS(DescribeSensor):
                         [
                             [
                                 testXMLAttribute(quan, "definition")
-                                for quan in comp.findall(
-                                    ".//" + nsp("swe101:Quantity")
+                                for quan in xpaths.findall(
+                                    comp, ".//swe101:Quantity"
                                 )
                             ]
                             for comp in self.system.components
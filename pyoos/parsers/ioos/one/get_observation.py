@@ -1,10 +1,8 @@
 from __future__ import absolute_import, division, print_function
 
-from owslib.crs import Crs
 from owslib.namespaces import Namespaces
 from owslib.util import (
     extract_time,
-    nspath_eval,
     testXMLAttribute,
     testXMLValue,
 )
@@ -13,81 +11,106 @@ from shapely.geometry import Point, box
 from pyoos.parsers.ioos.get_observation import IoosGetObservation
 from pyoos.parsers.ioos.one.timeseries import TimeSeries
 from pyoos.parsers.ioos.one.timeseries_profile import TimeSeriesProfile
+from pyoos.parsers.ioos.one.trajectory import Trajectory
+from pyoos.utils.crs import get_crs
+from pyoos.utils.xpath import XPathRegistry
 
 
 def get_namespaces():
     ns = Namespaces()
-    return ns.get_namespaces(["om10", "swe101", "swe20", "gml311", "xlink"])
+    return ns.get_namespaces(
+        ["om10", "swe10", "swe101", "swe20", "gml311", "xlink"]
+    )
 
 
 namespaces = get_namespaces()
 
 
-def nspv(path):
-    return nspath_eval(path, namespaces)
+xpaths = XPathRegistry(
+    namespaces,
+    [
+        "om10:member/om10:Observation",
+        "gml311:description",
+        "om10:samplingTime/gml311:TimePeriod/gml311:beginPosition",
+        "om10:samplingTime/gml311:TimePeriod/gml311:endPosition",
+        "om10:procedure/om10:Process/gml311:member",
+        "om10:observedProperty/swe101:CompositePhenomenon/swe101:component",
+        "om10:featureOfInterest/gml311:FeatureCollection/gml311:metaDataProperty/gml311:GenericMetaData/gml311:name",
+        "om10:featureOfInterest/gml311:FeatureCollection/gml311:metaDataProperty/gml311:name",
+        "om10:featureOfInterest/gml311:FeatureCollection/gml311:boundedBy/gml311:Envelope",
+        "gml311:boundedBy/gml311:Envelope",
+        "gml311:lowerCorner",
+        "gml311:upperCorner",
+        "om10:featureOfInterest/gml311:FeatureCollection/gml311:location",
+        "gml311:name",
+        "gml311:pos",
+        "gml311:pointMembers/gml311:Point",
+        "om10:result",
+        "swe20:DataRecord",
+        "swe10:DataStream",
+        "swe101:DataStream",
+    ],
+)
 
 
 class GetObservation(IoosGetObservation):
-    def __init__(self, element):
-        super(GetObservation, self).__init__(element=element)
+    def __init__(self, element, dense=False):
+        super(GetObservation, self).__init__(element=element, dense=dense)
 
         self.ioos_version = "1.0"
 
-        for ob in self._root.findall(nspv("om10:member/om10:Observation")):
-            ob_ele = OmObservation(ob)
+        for ob in xpaths.findall(self._root, "om10:member/om10:Observation"):
+            ob_ele = OmObservation(ob, dense=dense)
             self.observations.append(ob_ele)
 
 
 class OmObservation(object):
-    def __init__(self, element):
+    def __init__(self, element, dense=False):
         self._root = element
 
         self.description = testXMLValue(
-            self._root.find(nspv("gml311:description"))
+            xpaths.find(self._root, "gml311:description")
         )
 
         self.begin_position = extract_time(
-            self._root.find(
-                nspv(
-                    "om10:samplingTime/gml311:TimePeriod/gml311:beginPosition"
-                )
+            xpaths.find(
+                self._root,
+                "om10:samplingTime/gml311:TimePeriod/gml311:beginPosition",
             )
         )
 
         self.end_position = extract_time(
-            self._root.find(
-                nspv("om10:samplingTime/gml311:TimePeriod/gml311:endPosition")
+            xpaths.find(
+                self._root,
+                "om10:samplingTime/gml311:TimePeriod/gml311:endPosition",
             )
         )
 
         self.procedures = [
-            testXMLAttribute(e, nspv("xlink:href"))
-            for e in self._root.findall(
-                nspv("om10:procedure/om10:Process/gml311:member")
+            testXMLAttribute(e, xpaths.name("xlink:href"))
+            for e in xpaths.findall(
+                self._root, "om10:procedure/om10:Process/gml311:member"
             )
         ]
 
         self.observedProperties = [
-            testXMLAttribute(e, nspv("xlink:href"))
-            for e in self._root.findall(
-                nspv(
-                    "om10:observedProperty/swe101:CompositePhenomenon/swe101:component"
-                )
+            testXMLAttribute(e, xpaths.name("xlink:href"))
+            for e in xpaths.findall(
+                self._root,
+                "om10:observedProperty/swe101:CompositePhenomenon/swe101:component",
             )
         ]
 
         # Can't use a full Xpath expression, so iterate over all metaDataProperties to find the IOOS FeatureType
         self.feature_type = None
-        ft = self._root.findall(
-            nspv(
-                "om10:featureOfInterest/gml311:FeatureCollection/gml311:metaDataProperty/gml311:GenericMetaData/gml311:name"
-            )
+        ft = xpaths.findall(
+            self._root,
+            "om10:featureOfInterest/gml311:FeatureCollection/gml311:metaDataProperty/gml311:GenericMetaData/gml311:name",
         )
         ft.extend(
-            self._root.findall(
-                nspv(
-                    "om10:featureOfInterest/gml311:FeatureCollection/gml311:metaDataProperty/gml311:name"
-                )
+            xpaths.findall(
+                self._root,
+                "om10:featureOfInterest/gml311:FeatureCollection/gml311:metaDataProperty/gml311:name",
             )
         )
         ft_def = "http://cf-pcmdi.llnl.gov/documents/cf-conventions/1.6/cf-conventions.html#discrete-sampling-geometries"
@@ -96,17 +119,21 @@ class OmObservation(object):
                 self.feature_type = testXMLValue(f)
 
         # BBOX
-        envelope = self._root.find(
-            nspv(
-                "om10:featureOfInterest/gml311:FeatureCollection/gml311:boundedBy/gml311:Envelope"
-            )
+        envelope = xpaths.find(
+            self._root,
+            "om10:featureOfInterest/gml311:FeatureCollection/gml311:boundedBy/gml311:Envelope",
         )
-        self.bbox_srs = Crs(testXMLAttribute(envelope, "srsName"))
+        if envelope is None:
+            # NDBC trajectories bound the observation instead
+            envelope = xpaths.find(
+                self._root, "gml311:boundedBy/gml311:Envelope"
+            )
+        self.bbox_srs = get_crs(testXMLAttribute(envelope, "srsName"))
         lower_left_corner = testXMLValue(
-            envelope.find(nspv("gml311:lowerCorner"))
+            xpaths.find(envelope, "gml311:lowerCorner")
         ).split(" ")
         upper_right_corner = testXMLValue(
-            envelope.find(nspv("gml311:upperCorner"))
+            xpaths.find(envelope, "gml311:upperCorner")
         ).split(" ")
         if self.bbox_srs.axisorder == "yx":
             self.bbox = box(
@@ -124,43 +151,75 @@ class OmObservation(object):
             )
 
         # LOCATION
-        location = self._root.find(
-            nspv(
-                "om10:featureOfInterest/gml311:FeatureCollection/gml311:location"
-            )
+        location = xpaths.find(
+            self._root,
+            "om10:featureOfInterest/gml311:FeatureCollection/gml311:location",
         )
         # Should only have one child
         geo = list(location)[-1]
         self.location = {}
 
         def get_point(element, srs):
-            name = testXMLValue(element.find(nspv("gml311:name")))
-            point = testXMLValue(element.find(nspv("gml311:pos"))).split(" ")
+            name = testXMLValue(xpaths.find(element, "gml311:name"))
+            point = testXMLValue(xpaths.find(element, "gml311:pos")).split(" ")
             if srs.axisorder == "yx":
                 point = Point(float(point[1]), float(point[0]))
             else:
                 point = Point(float(point[0]), float(point[1]))
             return name, point
 
-        self.location_srs = Crs(testXMLAttribute(geo, "srsName"))
-        if geo.tag == nspv("gml311:Point"):
+        self.location_srs = get_crs(testXMLAttribute(geo, "srsName"))
+        if geo.tag == xpaths.name("gml311:Point"):
             n, p = get_point(geo, self.location_srs)
             self.location[n] = p
-        elif geo.tag == nspv("gml311:MultiPoint"):
-            for point in geo.findall(nspv("gml311:pointMembers/gml311:Point")):
+        elif geo.tag == xpaths.name("gml311:MultiPoint"):
+            for point in xpaths.findall(
+                geo, "gml311:pointMembers/gml311:Point"
+            ):
                 n, p = get_point(point, self.location_srs)
                 self.location[n] = p
 
         # Now the fields change depending on the FeatureType
-        self.results = self._root.find(nspv("om10:result"))
+        self.results = xpaths.find(self._root, "om10:result")
 
         # TODO: This should be implemented as a Factory
-        self.feature = None
-        data = self.results.find(nspv("swe20:DataRecord"))
-        if data is not None:
+        self._feature = None
+        # TimeSeries of timeSeries observations, its paegan feature is only
+        # built when self.feature is read
+        self.timeseries = None
+        data = xpaths.find(self.results, "swe20:DataRecord")
+        stream = xpaths.find(self.results, "swe10:DataStream")
+        if stream is None:
+            stream = xpaths.find(self.results, "swe101:DataStream")
+
+        if (
+            self.feature_type in ("trajectory", "trajectoryProfile")
+            and stream is not None
+        ):
+            # Arrays of time, lon, lat, z and variables
+            self._feature = Trajectory(stream)
+        elif data is not None:
             if self.feature_type == "timeSeries":
-                self.feature = TimeSeries(data).feature
+                self.timeseries = TimeSeries(data)
+                if dense:
+                    # dict of sensor -> column arrays
+                    self._feature = self.timeseries.columns
             elif self.feature_type == "timeSeriesProfile":
-                self.feature = TimeSeriesProfile(data).feature
+                if dense:
+                    # dict of station -> sensor -> arrays
+                    self._feature = TimeSeriesProfile(data, dense=True).arrays
+                else:
+                    self._feature = TimeSeriesProfile(data).feature
             else:
                 print("No feature type found.")
+
+    @property
+    def feature(self):
+        """
+        The paegan feature of the observation (see TimeSeries and
+        TimeSeriesProfile), or the decoded arrays for dense and trajectory
+        observations.
+        """
+        if self._feature is None and self.timeseries is not None:
+            self._feature = self.timeseries.feature
+        return self._feature
@@ -1,9 +1,9 @@
 from __future__ import absolute_import, division, print_function
 
+from collections import OrderedDict, defaultdict
 from copy import copy
 
-from dateutil import parser
-from owslib.crs import Crs
+import numpy as np
 from owslib.namespaces import Namespaces
 from owslib.swe.common import (
     AbstractSimpleComponent,
@@ -18,6 +18,9 @@ from paegan.cdm.dsg.features.station import Station
 from paegan.cdm.dsg.member import Member
 from shapely.geometry import Point as sPoint
 
+from pyoos.utils.asatime import AsaTime
+from pyoos.utils.crs import get_crs
+
 
 def get_namespaces():
     ns = Namespaces()
@@ -50,13 +53,13 @@ class TimeSeries(object):
             srss = vector.referenceFrame.split("&amp;")
             hsrs = None
             try:
-                hsrs = Crs(srss[0])
+                hsrs = get_crs(srss[0])
             except ValueError:
                 pass
 
             vsrs = None
             try:
-                vsrs = Crs(srss[-1].replace("2=http:", "http:"))
+                vsrs = get_crs(srss[-1].replace("2=http:", "http:"))
             except ValueError:
                 pass
 
@@ -97,11 +100,11 @@ class TimeSeries(object):
                     if hasattr(sensor, "referenceFrame"):
                         srss = sensor.referenceFrame.split("&amp;")
                         try:
-                            horizontal_srs = Crs(srss[0])
+                            horizontal_srs = get_crs(srss[0])
                         except ValueError:
                             pass
                         try:
-                            vertical_srs = Crs(
+                            vertical_srs = get_crs(
                                 srss[-1].replace("2=http:", "http:")
                             )
                         except ValueError:
@@ -126,6 +129,9 @@ class TimeSeries(object):
 
             stations[s.uid] = s
 
+        self.stations = stations
+        self.sensors = sensors
+
         # Start building the column structure
         data_array = record.get_by_name("observationData").content
         data_record = data_array.elementType.content
@@ -140,9 +146,7 @@ class TimeSeries(object):
         for sendata in sensor_data.content.item:
             if sendata.content is not None:
                 sensors[sendata.name]["columns"] = []
-                sensors[sendata.name]["values"] = []
                 for f in sendata.content.field:
-                    # Create a model Member for each column that will be copied and filled with data from each row
                     sensors[sendata.name]["columns"].append(f)
 
         # decimalSeparator = data_array.encoding.decimalSeparator
@@ -153,79 +157,151 @@ class TimeSeries(object):
         data_values = data_array.values
         self.raw_data = copy(data_values)
 
-        for row in [x for x in data_values.split(blockSeparator) if x != ""]:
+        self._choice_index, self.plans = self._compile_plans(columns, sensors)
+        self._time_strings = {}
+        self.columns = self._decode(
+            data_values, tokenSeparator, blockSeparator
+        )
+        self._feature = None
 
-            pt = None
-            members = []
-            values = row.split(tokenSeparator)
-            sensor_key = None
-            i = 0
+    def _compile_plans(self, columns, sensors):
+        """
+        Compiles the column layout into a decode plan for every sensor of
+        the DataChoice, so rows don't need to be interpreted one by one.
 
+        Returns the index of the DataChoice (sensor key) column and a dict of
+        sensor name -> {"time": index of the sampling time column,
+        "members": [(index, name, units, standard), ...]}.
+        """
+        choice_index = None
+        plans = {}
+        for name, sensor in sensors.items():
+            plan = {"time": None, "members": []}
+            i = 0
             for x in columns:
-
                 if (
                     isinstance(x.content, Time)
                     and x.content.definition
                     == "http://www.opengis.net/def/property/OGC/0/SamplingTime"
                 ):
-                    pt = Point()
-                    pt.time = parser.parse(values[i])
+                    plan["time"] = i
 
                 elif isinstance(x.content, DataChoice):
-                    sensor_key = values[i]
-                    dc_cols = sensors[sensor_key]["columns"]
-
-                    for j, c in enumerate(dc_cols):
+                    if choice_index is None:
+                        choice_index = i
+                    for c in sensor["columns"]:
+                        i += 1
                         if isinstance(c.content, AbstractSimpleComponent):
-                            m = Member(
-                                units=c.content.uom,
-                                name=c.name,
-                                standard=c.content.definition,
-                                value=float(values[i + 1]),
+                            plan["members"].append(
+                                (
+                                    i,
+                                    c.name,
+                                    c.content.uom,
+                                    c.content.definition,
+                                )
                             )
-                            members.append(m)
-
-                        elif (
-                            isinstance(c.content, Time)
-                            and c.content.definition
-                            == "http://www.opengis.net/def/property/OGC/0/SamplingTime"
-                        ):
-                            pt = Point()
-                            pt.time = parser.parse(values[i])
-
-                        # For each data column
-                        i += 1
 
                 elif isinstance(x.content, AbstractSimpleComponent):
-                    m = Member(
-                        units=x.content.uom,
-                        name=x.name,
-                        standard=x.content.definition,
-                        value=float(values[i]),
+                    plan["members"].append(
+                        (i, x.name, x.content.uom, x.content.definition)
                     )
-                    members.append(m)
 
                 else:
                     print("WHAT AM I?")
 
                 i += 1
 
-            pt.members = members
-            pt.location = stations[sensors[sensor_key]["station"]].location
-            sensors[sensor_key]["values"].append(pt)
+            plans[name] = plan
 
-        for k, v in stations.items():
-            for sk, sv in sensors.items():
+        return choice_index, plans
+
+    def _decode(self, data_values, tokenSeparator, blockSeparator):
+        """
+        Decodes the whole values block into NumPy columns, returning a dict
+        of sensor name -> OrderedDict with a "time" datetime64 column and a
+        float column per member.
+        """
+        rows = defaultdict(list)
+        for row in data_values.split(blockSeparator):
+            row = row.strip()
+            if row == "":
+                continue
+            values = row.split(tokenSeparator)
+            rows[values[self._choice_index]].append(values)
+
+        decoded = {}
+        for name, sensor_rows in rows.items():
+            plan = self.plans[name]
+            table = np.array(sensor_rows, dtype=np.str_)
+
+            data = OrderedDict()
+            if plan["time"] is not None:
+                time_strings = table[:, plan["time"]]
+                self._time_strings[name] = time_strings.tolist()
+                data["time"] = AsaTime.parse_column(time_strings, unit="ms")
+            for i, member, _, _ in plan["members"]:
+                data[member] = table[:, i].astype(np.float64)
+
+            decoded[name] = data
+
+        return decoded
+
+    @property
+    def feature(self):
+        """
+        The paegan Station (or StationCollection for several stations) of
+        the decoded data, built on first access.
+        """
+        if self._feature is None:
+            self._feature = self._build_feature()
+        return self._feature
+
+    def _build_feature(self):
+        times = {}
+        for name, columns in self.columns.items():
+            plan = self.plans[name]
+            location = self.stations[self.sensors[name]["station"]].location
+            time_strings = self._time_strings.get(name)
+            member_values = [
+                columns[member].tolist() for _, member, _, _ in plan["members"]
+            ]
+
+            values = []
+            for k in range(len(next(iter(columns.values()), []))):
+                pt = Point()
+                if time_strings is not None:
+                    t = time_strings[k]
+                    if t not in times:
+                        times[t] = AsaTime.parse(t)
+                    pt.time = times[t]
+                pt.members = [
+                    Member(
+                        units=units,
+                        name=member,
+                        standard=standard,
+                        value=member_values[j][k],
+                    )
+                    for j, (_, member, units, standard) in enumerate(
+                        plan["members"]
+                    )
+                ]
+                pt.location = location
+                values.append(pt)
+
+            self.sensors[name]["values"] = values
+
+        for k, v in self.stations.items():
+            for sk, sv in self.sensors.items():
                 # Match on station uid
                 if sv["station"] == k:
                     v.elements = self._merge_points(
                         v.elements or [], sv["values"]
                     )
 
-        if len(stations) > 1:
-            self.feature = StationCollection(elements=stations)
-        elif len(stations) == 1:
-            self.feature = next(iter(stations.values()))
+        if len(self.stations) > 1:
+            return StationCollection(elements=self.stations)
+        elif len(self.stations) == 1:
+            return next(iter(self.stations.values()))
         else:
             print("No stations found!")
 
@@ -233,18 +309,42 @@ class TimeSeries(object):
         """
         Merges points based on time/location.
 
-        @TODO: move to paegan, SO SLOW
+        Points are indexed by time and rounded coordinates, so every point
+        of pc2 is matched against pc1 in constant time.
         """
         res = pc1[:]
+        # (time, x, y) -> [(position in res, point)]
+        located = defaultdict(list)
+        # time -> (position in res, point) of the first point without location
+        unlocated = {}
+
+        def key(p):
+            return (p.time, round(p.location.x, 6), round(p.location.y, 6))
+
+        def index(pos, p):
+            if p.location is None:
+                unlocated.setdefault(p.time, (pos, p))
+            else:
+                located[key(p)].append((pos, p))
+
+        for pos, sp in enumerate(res):
+            index(pos, sp)
 
         for p in pc2:
-            for sp in res:
-                if sp.time == p.time and (
-                    sp.location is None or (sp.location.equals(p.location))
-                ):
-                    sp.members.extend(p.members)
-                    break
+            matches = []
+            if p.time in unlocated:
+                matches.append(unlocated[p.time])
+            if p.location is not None:
+                for pos, sp in located.get(key(p), []):
+                    if sp.location.equals(p.location):
+                        matches.append((pos, sp))
+                        break
+
+            if matches:
+                # the earliest match, as a scan of res would find it
+                min(matches, key=lambda m: m[0])[1].members.extend(p.members)
             else:
+                index(len(res), p)
                 res.append(p)
 
         return res
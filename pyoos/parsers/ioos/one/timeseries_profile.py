@@ -1,10 +1,8 @@
 from __future__ import absolute_import, division, print_function
 
-from bisect import bisect_left
 from collections import OrderedDict, defaultdict
 
-from dateutil import parser
-from owslib.crs import Crs
+import numpy as np
 from owslib.namespaces import Namespaces
 from owslib.swe.common import DataChoice, DataRecord, Time
 from paegan.cdm.dsg.collections.base.profile_collection import (
@@ -17,6 +15,9 @@ from paegan.cdm.dsg.features.station_profile import StationProfile
 from paegan.cdm.dsg.member import Member
 from shapely.geometry import Point as sPoint
 
+from pyoos.utils.asatime import AsaTime
+from pyoos.utils.crs import get_crs
+
 
 def get_namespaces():
     ns = Namespaces()
@@ -36,6 +37,9 @@ class ProfileCache(object):
 
     def __init__(self):
         self._cache = defaultdict(OrderedDict)
+        # id(profile) -> {z: Point}, sorted into the profiles by
+        # get_collections
+        self._points = {}
 
     def add_obs(self, sensor, t, obs_point, obs_members):
         """
@@ -45,6 +49,11 @@ class ProfileCache(object):
         point.members.extend(obs_members)
 
     def get_collections(self):
+        for pd in self._cache.values():
+            for profile in pd.values():
+                points = self._points[id(profile)]
+                profile.elements = [points[z] for z in sorted(points)]
+
         return {
             k[2]: ProfileCollection(elements=list(pd.values()))
             for k, pd in self._cache.items()
@@ -67,29 +76,48 @@ class ProfileCache(object):
             profile.station = sensor["station"]
 
             profile_od[t] = profile
+            self._points[id(profile)] = {}
             return profile
 
         return profile_od[t]
 
     def _get_point(self, profile, point):
         """
-        Finds the given point in the profile, or adds it in sorted z order.
+        Finds the point at the given z in the profile, or adds it. Points
+        are put in z order when the collections are built.
         """
-        cur_points_z = [p.location.z for p in profile.elements]
+        points = self._points[id(profile)]
         try:
-            cur_idx = cur_points_z.index(point.z)
-            return profile.elements[cur_idx]
-        except ValueError:
-            new_idx = bisect_left(cur_points_z, point.z)
+            return points[point.z]
+        except KeyError:
             new_point = Point()
             new_point.location = sPoint(point)
             new_point.time = profile.time
-            profile.elements.insert(new_idx, new_point)
+            points[point.z] = new_point
             return new_point
 
 
 class TimeSeriesProfile(object):
-    def __init__(self, element):
+    """
+    Parses an IOOS SWE timeSeriesProfile DataRecord.
+
+    By default the data is returned as paegan StationProfile features in
+    self.feature. With dense=True no features are built; self.arrays then
+    holds, per station uid and sensor name, a dict of arrays:
+
+        time: datetime64 times, (time,)
+        bin: bin indices, (bin,)
+        bin_center / height: the profileBins centers or profileHeights of
+                             the sensor, (bin,)
+        bin_edges: the profileBins edges, if any, (bin, 2)
+        z: absolute height of each bin, (bin,)
+        variables, units, standards: the observed variables
+        values: float data, NaN where missing, (time, bin, variable)
+        quality: quality flags, "" where missing, (time, bin, variable), or
+                 None if the sensor has no quality fields
+    """
+
+    def __init__(self, element, dense=False):
         record = DataRecord(element)
 
         stations_field = record.get_by_name("stations")
@@ -107,13 +135,13 @@ class TimeSeriesProfile(object):
             srss = vector.referenceFrame.split("&amp;")
             hsrs = None
             try:
-                hsrs = Crs(srss[0])
+                hsrs = get_crs(srss[0])
             except ValueError:
                 pass
 
             vsrs = None
             try:
-                vsrs = Crs(srss[-1].replace("2=http:", "http:"))
+                vsrs = get_crs(srss[-1].replace("2=http:", "http:"))
             except ValueError:
                 pass
 
@@ -167,6 +195,14 @@ class TimeSeriesProfile(object):
 
             stations[s.uid] = s
 
+        if dense:
+            self.feature = None
+            self.arrays = self._parse_sensor_arrays(
+                record.get_by_name("observationData"), sensors
+            )
+            return
+
+        self.arrays = None
         sensor_data = self._parse_sensor_data(
             record.get_by_name("observationData"), sensors
         )
@@ -203,13 +239,13 @@ class TimeSeriesProfile(object):
 
         hsrs = None
         try:
-            hsrs = Crs(srss[0])
+            hsrs = get_crs(srss[0])
         except ValueError:
             pass
 
         vsrs = None
         try:
-            vsrs = Crs(srss[-1].replace("2=http:", "http:"))
+            vsrs = get_crs(srss[-1].replace("2=http:", "http:"))
         except ValueError:
             pass
 
@@ -356,7 +392,7 @@ class TimeSeriesProfile(object):
                     and c.content.definition
                     == "http://www.opengis.net/def/property/OGC/0/SamplingTime"
                 ):
-                    cur_time = parser.parse(values[i])
+                    cur_time = AsaTime.parse(values[i])
                     i += 1
 
                     if len(c.quality):
@@ -390,6 +426,196 @@ class TimeSeriesProfile(object):
 
         return profile_cache.get_collections()
 
+    def _parse_sensor_arrays(self, obs_el, sensor_info):
+        """
+        Returns dict of station id -> sensor name -> dense arrays
+        """
+        data_array = obs_el.content
+        data_record = data_array.elementType.content
+        columns = list(data_record.field)
+
+        tokenSeparator = data_array.encoding.tokenSeparator
+        blockSeparator = data_array.encoding.blockSeparator
+
+        data_values = data_array.values
+        lines = [x for x in data_values.split(blockSeparator) if x != ""]
+
+        layouts = {}
+        observations = {}
+
+        for row in lines:
+            values = row.split(tokenSeparator)
+
+            i = 0
+            cur_time = None
+
+            for c in columns:
+
+                if (
+                    isinstance(c.content, Time)
+                    and c.content.definition
+                    == "http://www.opengis.net/def/property/OGC/0/SamplingTime"
+                ):
+                    cur_time = values[i].strip()
+                    i += 1 + len(c.quality)
+
+                elif isinstance(c.content, DataChoice) and c.name == "sensor":
+                    sensor_key = values[i]
+                    i += 1
+
+                    if sensor_key not in layouts:
+                        layouts[sensor_key] = self._sensor_record_layout(
+                            c.content.get_by_name(sensor_key).content
+                        )
+                        observations[sensor_key] = {
+                            "time": [],
+                            "bin": [],
+                            "values": [],
+                            "quality": [],
+                        }
+
+                    i = self._read_sensor_record(
+                        layouts[sensor_key],
+                        values,
+                        i,
+                        cur_time,
+                        observations[sensor_key],
+                    )
+
+        arrays = defaultdict(dict)
+        for sensor_key, obs in observations.items():
+            sensor = sensor_info[sensor_key]
+            arrays[sensor["station"]][sensor_key] = self._build_arrays(
+                sensor, layouts[sensor_key], obs
+            )
+
+        return dict(arrays)
+
+    def _sensor_record_layout(self, sensor_data_rec):
+        """
+        Describes the fields of a sensor data record once, so its values can
+        be read without looking at the record definition again.
+        """
+        # @TODO seems there is only a single field in each of these
+        assert len(sensor_data_rec.field) == 1
+        sensor_data_array = sensor_data_rec.field[0].content
+
+        count = None
+        count_text = sensor_data_array.elementCount.text
+        if count_text:
+            count = int(count_text.strip())
+
+        fields = []
+        for f in sensor_data_array.elementType.field:
+            fields.append(
+                {
+                    "name": f.name,
+                    "units": getattr(f.content, "uom", None),
+                    "standard": f.content.definition,
+                    "quality": len(f.quality),
+                    "index": f.name in ("binIndex", "profileIndex"),
+                }
+            )
+
+        return {"count": count, "fields": fields}
+
+    def _read_sensor_record(self, layout, values, i, cur_time, obs):
+        """
+        Reads one sensor record starting at values[i] into obs and returns
+        the index of the first value after it.
+        """
+        count = layout["count"]
+        if not count:
+            count = int(values[i])
+            i += 1
+
+        for recnum in range(count):
+            bin_index = None
+            cur_values = []
+            cur_quality = []
+
+            for f in layout["fields"]:
+                cur_val = values[i]
+                i += 1
+
+                qual = values[i : i + f["quality"]]
+                i += f["quality"]
+
+                if f["index"]:
+                    bin_index = int(cur_val)
+                    continue
+
+                try:
+                    cur_values.append(float(cur_val))
+                except ValueError:
+                    cur_values.append(np.nan)
+                cur_quality.append(",".join(qual))
+
+            if bin_index is None:
+                raise ValueError("no binIndex or profileIndex in record")
+
+            obs["time"].append(cur_time)
+            obs["bin"].append(bin_index)
+            obs["values"].append(cur_values)
+            obs["quality"].append(cur_quality)
+
+        return i
+
+    def _build_arrays(self, sensor_info, layout, obs):
+        """
+        Scatters the observations of a sensor into (time, bin, variable)
+        arrays.
+        """
+        fields = [f for f in layout["fields"] if not f["index"]]
+
+        arrays = {"station": sensor_info["station"]}
+        if "profile_bins" in sensor_info:
+            bins = sensor_info["profile_bins"]
+            offsets = np.asarray(bins["bin_center"]["values"], dtype=float)
+            arrays["bin_center"] = offsets
+            arrays["bin_edges"] = np.asarray(
+                bins["bin_edges"]["values"], dtype=float
+            )
+        else:
+            offsets = np.asarray(
+                sensor_info["profile_heights"]["values"], dtype=float
+            )
+            arrays["height"] = offsets
+
+        times, time_idx = np.unique(
+            AsaTime.parse_column(obs["time"], unit="ms"), return_inverse=True
+        )
+        bin_idx = np.asarray(obs["bin"], dtype=int)
+
+        shape = (len(times), len(offsets), len(fields))
+        values = np.full(shape, np.nan)
+        values[time_idx, bin_idx] = np.asarray(
+            obs["values"], dtype=float
+        ).reshape(-1, len(fields))
+
+        quality = None
+        if any(f["quality"] for f in fields):
+            qual = np.asarray(obs["quality"], dtype=np.str_).reshape(
+                -1, len(fields)
+            )
+            quality = np.full(shape, "", dtype=qual.dtype)
+            quality[time_idx, bin_idx] = qual
+
+        arrays.update(
+            {
+                "time": times,
+                "bin": np.arange(len(offsets)),
+                "z": sensor_info["location"]["point"].z + offsets,
+                "variables": [f["name"] for f in fields],
+                "units": [f["units"] for f in fields],
+                "standards": [f["standard"] for f in fields],
+                "values": values,
+                "quality": quality,
+            }
+        )
+
+        return arrays
+
     def _parse_sensor_record(self, sensor_data_rec, sensor_info, rem_values):
         """
         Parses values via sensor data record passed in.
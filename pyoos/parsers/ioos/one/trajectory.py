@@ -0,0 +1,218 @@
+from __future__ import absolute_import, division, print_function
+
+from collections import OrderedDict
+
+import numpy as np
+
+from pyoos.utils.asatime import AsaTime
+from pyoos.utils.crs import get_crs
+
+# Vector coordinate axisID/name -> column
+COORDINATES = {
+    "lat": "lat",
+    "latitude": "lat",
+    "long": "lon",
+    "lon": "lon",
+    "longitude": "lon",
+    "h": "z",
+    "z": "z",
+    "height": "z",
+    "altitude": "z",
+    "depth": "z",
+}
+
+# Escapes used for separators in TextEncoding attributes
+SEPARATOR_ESCAPES = {"\\n": "\n", "\\r": "\r", "\\t": "\t"}
+
+
+class Trajectory(object):
+    """
+    Decodes the SWE DataStream of a trajectory or trajectoryProfile
+    observation (e.g. NDBC glider data) into contiguous NumPy arrays, one
+    value per row of the stream:
+
+        self.time        datetime64[ms]
+        self.lon, self.lat, self.z
+                         float64, NaN where missing (z is None if the
+                         stream has no vertical coordinate)
+        self.variables   OrderedDict of float64 arrays, by field name
+        self.units       uom of each variable
+        self.definitions definition of each variable
+        self.text        OrderedDict of str arrays for text fields that
+                         vary by row (e.g. sensor_id)
+        self.properties  values of the fields fixed in the description
+                         (e.g. station_id)
+        self.srs         Crs of the location, or None
+
+    Consecutive rows at the same time and position form a profile.
+    self.profile_offsets holds the first row of each profile followed by
+    the row count, so profile i is rows profile_offsets[i] to
+    profile_offsets[i + 1] (see profile()).
+
+    :param element: swe:DataStream element (SWE 1.0 or 1.0.1).
+    """
+
+    def __init__(self, element):
+        self._ns = element.tag[1:].split("}")[0]
+
+        self.properties = OrderedDict()
+        self.units = OrderedDict()
+        self.definitions = OrderedDict()
+        self.srs = None
+
+        # (column, kind) in row order, kind being time, coordinate,
+        # quantity or text
+        columns = []
+        for field in element.findall(self._tag("field")):
+            if not len(field):
+                continue
+            component = field[0]
+            kind = component.tag.split("}")[-1]
+            name = field.get("name")
+
+            if kind == "Vector":
+                try:
+                    self.srs = get_crs(component.get("referenceFrame"))
+                except (AttributeError, ValueError):
+                    pass
+                for coordinate in component.findall(self._tag("coordinate")):
+                    quantity = coordinate[0]
+                    axis = (
+                        quantity.get("axisID") or coordinate.get("name") or ""
+                    )
+                    columns.append(
+                        (
+                            COORDINATES.get(
+                                axis.lower(), coordinate.get("name")
+                            ),
+                            "coordinate",
+                        )
+                    )
+                continue
+
+            value = component.find(self._tag("value"))
+            if value is not None and value.text is not None:
+                # Given once for all rows
+                self.properties[name] = value.text.strip()
+            elif kind == "Time":
+                columns.append((name, "time"))
+            elif kind in ("Quantity", "Count"):
+                columns.append((name, "quantity"))
+                self.units[name] = self._uom(component)
+                self.definitions[name] = component.get("definition")
+            else:
+                columns.append((name, "text"))
+
+        table = self._read_values(element, len(columns))
+
+        self.time = None
+        self.lon = self.lat = self.z = None
+        self.variables = OrderedDict()
+        self.text = OrderedDict()
+        for i, (name, kind) in enumerate(columns):
+            strings = table[:, i]
+            if kind == "time":
+                self.time = self._decode_time(strings)
+            elif kind == "coordinate" and name in ("lon", "lat", "z"):
+                setattr(self, name, self._decode_float(strings))
+            elif kind in ("quantity", "coordinate"):
+                self.variables[name] = self._decode_float(strings)
+            else:
+                self.text[name] = strings
+
+        self.size = len(table)
+        self.profile_offsets = self._profile_offsets()
+
+    def _tag(self, local):
+        return "{%s}%s" % (self._ns, local)
+
+    def _uom(self, component):
+        uom = component.find(self._tag("uom"))
+        if uom is None:
+            return None
+        return uom.get("code") or uom.get("{http://www.w3.org/1999/xlink}href")
+
+    def _read_values(self, element, count):
+        """
+        Splits swe:values into a (rows, count) array of strings, skipping
+        blank blocks.
+        """
+        token, block, decimal = ",", "\n", "."
+        encoding = element.find(
+            "%s/%s" % (self._tag("encoding"), self._tag("TextEncoding"))
+        )
+        if encoding is not None:
+            token = self._separator(encoding.get("tokenSeparator"), token)
+            block = self._separator(encoding.get("blockSeparator"), block)
+            decimal = encoding.get("decimalSeparator") or decimal
+        self._decimal = decimal
+
+        values = element.find(self._tag("values"))
+        text = values.text if values is not None and values.text else ""
+
+        rows = [row.strip() for row in text.split(block)]
+        rows = [row for row in rows if row]
+        if not rows or not count:
+            return np.empty((0, count), dtype=np.str_)
+
+        tokens = np.array(token.join(rows).split(token), dtype=np.str_)
+        if tokens.size != len(rows) * count:
+            raise ValueError(
+                "DataStream rows do not all have {} values".format(count)
+            )
+        return tokens.reshape(len(rows), count)
+
+    @staticmethod
+    def _separator(value, default):
+        if not value:
+            return default
+        return SEPARATOR_ESCAPES.get(value, value)
+
+    def _decode_float(self, strings):
+        strings = np.char.strip(strings)
+        if self._decimal != ".":
+            strings = np.char.replace(strings, self._decimal, ".")
+        return np.where(strings == "", "nan", strings).astype(np.float64)
+
+    @staticmethod
+    def _decode_time(strings):
+        times = np.full(len(strings), np.datetime64("NaT"), "M8[ms]")
+        present = strings != ""
+        times[present] = AsaTime.parse_column(strings[present], unit="ms")
+        return times
+
+    def _profile_offsets(self):
+        if not self.size:
+            return np.zeros(1, dtype=np.intp)
+
+        change = np.zeros(self.size - 1, dtype=bool)
+        for a in (self.time, self.lon, self.lat):
+            if a is None:
+                continue
+            same = a[1:] == a[:-1]
+            # Missing values repeat rather than change
+            if a.dtype.kind == "M":
+                same |= np.isnat(a[1:]) & np.isnat(a[:-1])
+            else:
+                same |= np.isnan(a[1:]) & np.isnan(a[:-1])
+            change |= ~same
+
+        return np.concatenate(
+            ([0], np.flatnonzero(change) + 1, [self.size])
+        ).astype(np.intp)
+
+    def profile(self, i):
+        """
+        Returns the rows of profile i as an OrderedDict of array views:
+        time, lon, lat, z and the variables.
+        """
+        rows = slice(self.profile_offsets[i], self.profile_offsets[i + 1])
+        arrays = OrderedDict(
+            (name, getattr(self, name)[rows])
+            for name in ("time", "lon", "lat", "z")
+            if getattr(self, name) is not None
+        )
+        arrays.update(
+            (name, values[rows]) for name, values in self.variables.items()
+        )
+        return arrays
@@ -1,6 +1,11 @@
 from __future__ import absolute_import, division, print_function
 
+import re
+from datetime import datetime
+
 import dateutil.parser as dateparser
+import numpy as np
+import pytz
 
 
 class AsaTime(object):
@@ -50,16 +55,105 @@ class AsaTime(object):
         for tz_code in tz_descr[1:]:
             tzd[tz_code] = tz_offset
 
+    # Fixed formats used by the services pyoos talks to. Strings are matched
+    # to a format by their "shape" (every digit replaced by 0), which is
+    # resolved once and cached, so dateutil only sees unrecognized strings.
+    fixed_formats = [
+        ("%Y-%m-%dT%H:%M:%SZ", True),
+        ("%Y-%m-%dT%H:%M:%S.%fZ", True),
+        ("%Y-%m-%dT%H:%MZ", True),
+        ("%Y-%m-%dT%H:%M:%S", True),
+        ("%Y-%m-%dT%H:%M:%S.%f", True),
+        ("%Y-%m-%d %H:%M:%S", True),
+        ("%Y-%m-%d %H:%M", True),
+        ("%Y-%m-%d", True),
+        # NERRS utcStamp
+        ("%m/%d/%Y %H:%M", False),
+        ("%m/%d/%Y %H:%M:%S", False),
+        ("%m/%d/%Y %I:%M:%S %p", False),
+    ]  # (format, NumPy can parse it natively once a trailing Z is dropped)
+    format_cache = {}
+    # A regex rather than str.translate, which on Python 2 takes no dict
+    # for the byte strings NumPy string arrays give back
+    digits = re.compile(r"[0-9]")
+    # Number of strings parse_column looks at to pick a format
+    sample_size = 1000
+
+    @classmethod
+    def get_format(cls, date_string):
+        """
+            Returns the (format, numpy_native) entry of fixed_formats that
+            matches date_string, or None if it has no fixed format.
+        """
+        shape = cls.digits.sub("0", date_string)
+        try:
+            return cls.format_cache[shape]
+        except KeyError:
+            pass
+
+        match = None
+        for fmt, numpy_native in cls.fixed_formats:
+            try:
+                datetime.strptime(date_string, fmt)
+            except ValueError:
+                continue
+            match = (fmt, numpy_native)
+            break
+
+        cls.format_cache[shape] = match
+        return match
+
     @classmethod
     def parse(cls, date_string):
         """
-            Parse any time string.  Use a custom timezone matching if
-            the original matching does not pull one out.
+            Parse any time string.  Known fixed formats are parsed directly,
+            anything else goes through dateutil with a custom timezone
+            matching for names it does not know.
         """
+        fixed = cls.get_format(date_string)
+        if fixed is not None:
+            try:
+                date = datetime.strptime(date_string, fixed[0])
+                if fixed[0].endswith("Z"):
+                    date = date.replace(tzinfo=pytz.utc)
+                return date
+            except ValueError:
+                pass
+
         try:
-            date = dateparser.parse(date_string)
-            if date.tzinfo is None:
-                date = dateparser.parse(date_string, tzinfos=cls.tzd)
-            return date
+            return dateparser.parse(date_string, tzinfos=cls.tzd)
         except Exception:
             raise ValueError("Could not parse date string!")
+
+    @classmethod
+    def parse_column(cls, date_strings, unit="s"):
+        """
+            Parse a sequence of time strings into a NumPy datetime64 array
+            of naive UTC times.  Columns in formats NumPy understands are
+            converted in bulk, anything else string by string.
+        """
+        dtype = "datetime64[%s]" % unit
+        strings = np.asarray(date_strings, dtype=np.str_)
+        if strings.size == 0:
+            return np.array([], dtype=dtype)
+
+        # Formats are detected on a sample spread over the column, a bulk
+        # conversion that trips over a string outside of it falls back to
+        # parsing string by string
+        step = max(1, strings.size // cls.sample_size)
+        sample = strings[::step].tolist()
+        shapes = {cls.digits.sub("0", s): s for s in sample}
+        formats = [cls.get_format(s) for s in shapes.values()]
+        if all(f is not None and f[1] for f in formats):
+            try:
+                return np.char.rstrip(strings, "Z").astype(dtype)
+            except ValueError:
+                pass
+
+        dates = []
+        for date_string in strings.tolist():
+            date = cls.parse(date_string)
+            if date.tzinfo is not None:
+                date = date.astimezone(pytz.utc).replace(tzinfo=None)
+            dates.append(date)
+        return np.array(dates, dtype=dtype)
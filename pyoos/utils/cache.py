@@ -0,0 +1,116 @@
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+# Station catalogs change rarely, keep them for a week by default
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+
+def default_cache_dir():
+    """
+    The cache directory used when none is given: $PYOOS_CACHE_DIR if set,
+    otherwise ~/.cache/pyoos.
+    """
+    return os.environ.get(
+        "PYOOS_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "pyoos"),
+    )
+
+
+class CatalogCache(object):
+    """
+    Persistent, process-safe cache for station catalogs and other slowly
+    changing metadata, keyed by collector and endpoint.
+
+    Values must be JSON serializable. Entries are stored in a SQLite
+    database, so several processes can share a cache directory.
+
+    :param cache_dir: directory to keep the cache in (see default_cache_dir).
+    :param ttl: seconds an entry stays fresh.
+    """
+
+    def __init__(self, cache_dir=None, ttl=DEFAULT_TTL):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.ttl = ttl
+
+        try:
+            os.makedirs(self.cache_dir)
+        except OSError:
+            if not os.path.isdir(self.cache_dir):
+                raise
+
+        self.path = os.path.join(self.cache_dir, "catalog.sqlite")
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS catalog ("
+                "collector TEXT NOT NULL, "
+                "endpoint TEXT NOT NULL, "
+                "updated REAL NOT NULL, "
+                "value TEXT NOT NULL, "
+                "PRIMARY KEY (collector, endpoint))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # A generous timeout lets concurrent writers wait for the lock
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, collector, endpoint, ttl=None):
+        """
+        Returns the cached value, or None if it is missing or older than ttl
+        (defaults to the cache's ttl).
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT updated, value FROM catalog "
+                "WHERE collector = ? AND endpoint = ?",
+                (collector, endpoint),
+            ).fetchone()
+
+        if row is None or time.time() - row[0] > ttl:
+            return None
+        return json.loads(row[1])
+
+    def set(self, collector, endpoint, value):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO catalog "
+                "(collector, endpoint, updated, value) VALUES (?, ?, ?, ?)",
+                (collector, endpoint, time.time(), json.dumps(value)),
+            )
+
+    def get_or_fetch(self, collector, endpoint, fetch, force=False, ttl=None):
+        """
+        Returns the cached value, calling fetch() and storing its result if
+        the entry is missing, stale or force is True.
+        """
+        if not force:
+            value = self.get(collector, endpoint, ttl=ttl)
+            if value is not None:
+                return value
+
+        value = fetch()
+        self.set(collector, endpoint, value)
+        return value
+
+    def clear(self, collector=None):
+        """
+        Removes all entries, or only those of the given collector.
+        """
+        with self._connect() as conn:
+            if collector is None:
+                conn.execute("DELETE FROM catalog")
+            else:
+                conn.execute(
+                    "DELETE FROM catalog WHERE collector = ?", (collector,)
+                )
@@ -0,0 +1,41 @@
+from __future__ import absolute_import, division, print_function
+
+from multiprocessing.pool import ThreadPool
+
+# Default bound on concurrent requests made against a single service
+DEFAULT_MAX_WORKERS = 8
+
+
+def threaded_map(func, items, max_workers=None, return_exceptions=False):
+    """
+    Applies func to every item using a bounded pool of threads and returns
+    the results in the same order as items.
+
+    :param max_workers: maximum number of concurrent calls, defaults to
+                        DEFAULT_MAX_WORKERS. 1 runs everything serially.
+    :param return_exceptions: if True, an exception raised by func is
+                              returned in place of that item's result
+                              instead of being raised.
+    """
+    items = list(items)
+    if max_workers is None:
+        max_workers = DEFAULT_MAX_WORKERS
+    max_workers = max(1, min(max_workers, len(items)))
+
+    def call(item):
+        try:
+            return func(item)
+        except Exception as e:
+            if return_exceptions:
+                return e
+            raise
+
+    if max_workers == 1:
+        return [call(item) for item in items]
+
+    pool = ThreadPool(max_workers)
+    try:
+        return pool.map(call, items)
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,29 @@
+from __future__ import absolute_import, division, print_function
+
+from owslib.crs import Crs
+
+# srs definition -> Crs, or the message of the ValueError it raised
+_crs = {}
+
+
+def get_crs(srs):
+    """
+    Returns the owslib Crs for an srs definition (EPSG code, URN or URI).
+
+    Documents repeat the same few definitions for every station and
+    observation, so each is parsed once per process and the Crs shared.
+    The returned Crs must not be modified. Like Crs, raises ValueError for
+    definitions it cannot parse.
+    """
+    try:
+        crs = _crs[srs]
+    except KeyError:
+        try:
+            crs = Crs(srs)
+        except ValueError as e:
+            crs = str(e)
+        crs = _crs.setdefault(srs, crs)
+
+    if not isinstance(crs, Crs):
+        raise ValueError(crs)
+    return crs
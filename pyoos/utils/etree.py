@@ -36,3 +36,48 @@ except ImportError:
             raise RuntimeError(
                 "You need either lxml or ElementTree to use pyoos!"
             )
+
+
+# lxml refuses text nodes over 10MB unless huge_tree is set, which the
+# swe:values of long observations (e.g. glider missions) exceed
+HUGE_TREE = {"huge_tree": True} if hasattr(etree, "LXML_VERSION") else {}
+
+
+def parse_root(element, huge_tree=False):
+    """
+    Returns the root element of element, which is an element, a tree or an
+    XML document (bytes/text) that is parsed. huge_tree lifts lxml's limits
+    on the document size.
+    """
+    if isinstance(element, ElementType):
+        root = element
+    else:
+        parser = etree.XMLParser(**(HUGE_TREE if huge_tree else {}))
+        root = etree.fromstring(element, parser=parser)
+
+    if hasattr(root, "getroot"):
+        root = root.getroot()
+
+    return root
+
+
+def new_with_root(cls, root):
+    """
+    For factories that parse the document in __new__ to pick the class to
+    create: returns a new cls instance carrying root, which get_root then
+    hands to __init__ so the document is only parsed once.
+    """
+    obj = object.__new__(cls)
+    obj._root = root
+    return obj
+
+
+def get_root(obj, element, huge_tree=False):
+    """
+    Returns the root attached to obj by new_with_root, or parses element if
+    obj was created some other way.
+    """
+    root = getattr(obj, "_root", None)
+    if root is None:
+        root = parse_root(element, huge_tree=huge_tree)
+    return root
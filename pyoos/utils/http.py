@@ -0,0 +1,75 @@
+from __future__ import absolute_import, division, print_function
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from urllib3.util.retry import Retry
+except ImportError:
+    from requests.packages.urllib3.util.retry import Retry
+
+
+class PyoosSession(requests.Session):
+    """
+    A requests.Session with keep-alive connection pools, gzip negotiation,
+    a default timeout and retry/backoff on connection errors and 5xx
+    responses.
+
+    :param pool_size: maximum number of pooled connections per host.
+    :param max_retries: number of times to retry a failed request.
+    :param backoff_factor: sleep factor between retries (see urllib3 Retry).
+    :param timeout: default timeout (seconds) for requests that don't set one.
+    """
+
+    def __init__(
+        self, pool_size=10, max_retries=3, backoff_factor=0.5, timeout=120
+    ):
+        super(PyoosSession, self).__init__()
+        self.timeout = timeout
+
+        self.headers["Accept-Encoding"] = "gzip, deflate"
+
+        retry_kwargs = dict(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            raise_on_status=False,
+        )
+        # The services we talk to use POST for plain queries, so retry those too
+        methods = frozenset(["HEAD", "GET", "POST", "PUT", "OPTIONS"])
+        try:
+            retry = Retry(allowed_methods=methods, **retry_kwargs)
+        except TypeError:
+            # urllib3 < 1.26
+            retry = Retry(method_whitelist=methods, **retry_kwargs)
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super(PyoosSession, self).request(method, url, **kwargs)
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the process wide PyoosSession shared by all collectors that
+    have not been given their own session.
+    """
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = PyoosSession()
+        return _default_session
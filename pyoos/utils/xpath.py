@@ -0,0 +1,94 @@
+from __future__ import absolute_import, division, print_function
+
+from pyoos.utils.etree import etree
+
+
+class XPathRegistry(object):
+    """
+    Namespace prefixed ElementPath expressions (e.g.
+    "om10:samplingTime/gml311:TimePeriod"), resolved once against a
+    namespace map and, when lxml is available, compiled to ETXPath objects.
+    With ElementTree the resolved paths are used with find/findall.
+
+    :param namespaces: prefix -> namespace URI map.
+    :param paths: paths to compile upfront, others are compiled on first use.
+    """
+
+    def __init__(self, namespaces, paths=()):
+        self.namespaces = namespaces
+        self._names = {}
+        self._compiled = {}
+        for path in paths:
+            self._compile(path)
+
+    def name(self, path):
+        """
+        Returns the path, tag or attribute name in {namespace}name notation.
+        """
+        try:
+            return self._names[path]
+        except KeyError:
+            pass
+
+        steps = []
+        for step in self._split(path):
+            tag, bracket, predicate = step.partition("[")
+            if ":" in tag:
+                prefix, local = tag.split(":", 1)
+                tag = "{%s}%s" % (self.namespaces[prefix], local)
+            steps.append(tag + bracket + predicate)
+
+        name = self._names[path] = "/".join(steps)
+        return name
+
+    @staticmethod
+    def _split(path):
+        """
+        Splits path on the slashes that are not inside a predicate.
+        """
+        steps = []
+        depth = 0
+        start = 0
+        for i, char in enumerate(path):
+            if char == "[":
+                depth += 1
+            elif char == "]":
+                depth -= 1
+            elif char == "/" and depth == 0:
+                steps.append(path[start:i])
+                start = i + 1
+        steps.append(path[start:])
+        return steps
+
+    def _compile(self, path):
+        try:
+            return self._compiled[path]
+        except KeyError:
+            pass
+
+        if hasattr(etree, "ETXPath"):
+            compiled = etree.ETXPath(self.name(path))
+        else:
+            compiled = None
+        self._compiled[path] = compiled
+        return compiled
+
+    def find(self, element, path):
+        """
+        Returns the first element matching path, or None.
+        """
+        compiled = self._compile(path)
+        if compiled is None:
+            return element.find(self.name(path))
+
+        found = compiled(element)
+        return found[0] if found else None
+
+    def findall(self, element, path):
+        """
+        Returns a list of all elements matching path.
+        """
+        compiled = self._compile(path)
+        if compiled is None:
+            return element.findall(self.name(path))
+        return compiled(element)
@@ -1,10 +1,13 @@
 from __future__ import absolute_import, division, print_function
 
+import shutil
+import tempfile
 import unittest
 
 from paegan.cdm.dsg.collections.station_collection import StationCollection
 
 from pyoos.collectors.awc.awc_rest import AwcRest
+from pyoos.utils.cache import CatalogCache
 
 
 class AwcRestTest(unittest.TestCase):
@@ -16,6 +19,17 @@ class AwcRestTest(unittest.TestCase):
         assert stations[0] == "AAAD"
         assert stations[-1] == "ZYYY"
 
+    def test_cached_stations(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache = CatalogCache(cache_dir=cache_dir)
+            cache.set("AwcRest", self.c.stations_url, ["AAAD", "ZYYY"])
+
+            c = AwcRest(catalog_cache=cache)
+            assert c.stations == ["AAAD", "ZYYY"]
+        finally:
+            shutil.rmtree(cache_dir)
+
     def test_bbox_filter_raw(self):
         self.c.filter(bbox=(-80, 30, -60, 50))
         response = self.c.raw()
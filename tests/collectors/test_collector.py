@@ -1,5 +1,7 @@
 from __future__ import absolute_import, division, print_function
 
+import shutil
+import tempfile
 import unittest
 from datetime import datetime
 
@@ -7,6 +9,8 @@ from pytz import timezone
 from pytz.reference import Eastern
 
 from pyoos.collectors.collector import Collector
+from pyoos.utils.cache import CatalogCache
+from pyoos.utils.http import PyoosSession, get_session
 
 
 class CollectorTest(unittest.TestCase):
@@ -29,3 +33,66 @@ class CollectorTest(unittest.TestCase):
             2000, 2, 1, 15, tzinfo=timezone("UTC")
         )
         assert c._end_time == datetime(2000, 2, 3, 13, tzinfo=timezone("UTC"))
+
+    def test_default_session_is_shared(self):
+        c1 = Collector()
+        c2 = Collector()
+
+        assert isinstance(c1.session, PyoosSession)
+        assert c1.session is c2.session
+        assert c1.session is get_session()
+
+    def test_custom_session(self):
+        session = PyoosSession(pool_size=2, max_retries=0, timeout=5)
+        c = Collector(session=session)
+        assert c.session is session
+
+        adapter = session.get_adapter("https://example.com")
+        assert adapter._pool_maxsize == 2
+        assert adapter.max_retries.total == 0
+        assert "gzip" in session.headers["Accept-Encoding"]
+
+
+class CatalogCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = CatalogCache(cache_dir=self.cache_dir)
+        self.fetches = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def fetch(self):
+        self.fetches += 1
+        return ["A", "B", self.fetches]
+
+    def test_get_or_fetch(self):
+        first = self.cache.get_or_fetch("Test", "url", self.fetch)
+        second = self.cache.get_or_fetch("Test", "url", self.fetch)
+        assert first == second == ["A", "B", 1]
+        assert self.fetches == 1
+
+        # shared between instances using the same directory
+        other = CatalogCache(cache_dir=self.cache_dir)
+        assert other.get("Test", "url") == ["A", "B", 1]
+        assert other.get("Other", "url") is None
+
+    def test_ttl_and_force(self):
+        self.cache.get_or_fetch("Test", "url", self.fetch)
+        assert self.cache.get("Test", "url", ttl=-1) is None
+
+        self.cache.get_or_fetch("Test", "url", self.fetch, force=True)
+        assert self.fetches == 2
+
+        self.cache.clear("Test")
+        assert self.cache.get("Test", "url") is None
+
+    def test_collector_catalog(self):
+        c = Collector(catalog_cache=self.cache)
+        assert c._get_catalog("url", self.fetch) == ["A", "B", 1]
+        assert c._get_catalog("url", self.fetch) == ["A", "B", 1]
+        assert self.cache.get("Collector", "url") == ["A", "B", 1]
+
+        # no cache configured, always fetches
+        c = Collector()
+        assert c._get_catalog("url", self.fetch) == ["A", "B", 2]
@@ -3,12 +3,15 @@ from __future__ import absolute_import, division, print_function
 import csv
 import io
 import unittest
+import warnings
 from datetime import datetime
 
 from owslib.swe.sensor.sml import SensorML
+from owslib.util import ServiceException
 from six import string_types
 
 from pyoos.collectors.coops.coops_sos import CoopsSos
+from tests.utils import resource_file
 
 
 class CoopsSosTest(unittest.TestCase):
@@ -126,3 +129,44 @@ class CoopsSosTest(unittest.TestCase):
             == "0.863"
         )
         assert data[0]["vertical_position (m)"] == "1.818"
+
+
+class CoopsSosFanOutTest(unittest.TestCase):
+    def setUp(self):
+        caps = open(
+            resource_file("ioos_swe/SOS-GetCapabilities.xml"), "rb"
+        ).read()
+        self.c = CoopsSos(xml=caps)
+        self.c.server.get_observation = self.get_observation
+        self.c.variables = ["water_surface_height_above_reference_datum"]
+
+    def get_observation(self, **params):
+        station = params["offerings"][0].split(":")[-1]
+        if station == "bad":
+            raise ServiceException("station not found")
+        return (
+            b"station_id,date_time,value\n"
+            b"urn:ioos:station:NOAA.NOS.CO-OPS:%s,2012-10-01T00:00:00Z,1.0\n"
+        ) % station.encode()
+
+    def test_bad_station_is_isolated(self):
+        self.c.features = ["8454000", "bad", "8452660"]
+
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            response = self.c.raw().decode()
+        assert len(w) == 1
+
+        data = list(csv.DictReader(io.StringIO(response)))
+        assert [d["station_id"] for d in data] == [
+            "urn:ioos:station:NOAA.NOS.CO-OPS:8454000",
+            "urn:ioos:station:NOAA.NOS.CO-OPS:8452660",
+        ]
+        assert [o for o, t, e in self.c.failed_requests] == [
+            "urn:ioos:station:NOAA.NOS.CO-OPS:bad"
+        ]
+
+    def test_all_stations_failing(self):
+        self.c.features = ["bad", "bad"]
+        with self.assertRaises(ServiceException):
+            self.c.raw()
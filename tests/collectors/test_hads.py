@@ -1,8 +1,68 @@
 from __future__ import absolute_import, division, print_function
 
+import shutil
+import tempfile
 import unittest
 
+import pytest
+
 from pyoos.collectors.hads.hads import Hads
+from pyoos.collectors.hads.states import get_state_index
+from pyoos.utils.cache import CatalogCache
+
+
+class FakeResponse(object):
+    encoding = None
+
+    def __init__(self, text, ok=True):
+        self.text = text
+        self.ok = ok
+        self.closed = False
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise IOError("server error")
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.text.splitlines())
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession(object):
+    """
+    Answers requests with respond(url, data), which returns the response
+    text or None for a failed request, and records them.
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.extraids = []
+        self.responses = []
+
+    def get(self, url, **kwargs):
+        return self._answer(url, None)
+
+    def post(self, url, data, **kwargs):
+        self.extraids.append(data["extraids"].split())
+        return self._answer(url, data)
+
+    def _answer(self, url, data):
+        text = self.respond(url, data)
+        resp = FakeResponse(text or "", ok=text is not None)
+        self.responses.append(resp)
+        return resp
+
+
+def station_rows(url, data):
+    """
+    One row per requested station, chunks with a BAD station fail.
+    """
+    codes = data["extraids"].split()
+    if "BAD" in codes:
+        return None
+    return "".join("{}|row|\r\n".format(c) for c in codes)
 
 
 class HadsTest(unittest.TestCase):
@@ -28,12 +88,12 @@ class HadsTest(unittest.TestCase):
 
         self.c._list_variables = list_vars
 
-        def state_urls():
+        def state_urls(force=False):
             return ["https://hads.ncep.noaa.gov/charts/RI.html"]
 
         self.c._get_state_urls = state_urls
 
-        def get_stations_for_state(url):
+        def get_stations_for_state(url, force=False):
             # all RI stations
             return [
                 "17E3D706",
@@ -82,3 +142,147 @@ class HadsTest(unittest.TestCase):
         codes = self.c.list_features()
 
         assert set(codes) == set(features)
+
+    def test_station_discovery_keeps_state_order(self):
+        states = {
+            "https://hads.ncep.noaa.gov/charts/{}.html".format(s): [
+                "{}{}".format(s, i) for i in range(3)
+            ]
+            for s in ["CT", "MA", "RI", "VT"]
+        }
+
+        self.c._get_state_urls = lambda force=False: sorted(states)
+        self.c._get_stations_for_state = lambda url, force=False: states[
+            url
+        ]
+        self.c.max_workers = 4
+
+        codes = self.c.list_features()
+        assert codes == [
+            code for url in sorted(states) for code in states[url]
+        ]
+
+    def test_states_in_bbox(self):
+        index = get_state_index()
+        assert index is get_state_index()
+
+        assert index.states_in_bbox((-71.9, 41.3, -71.1, 42.0)) == [
+            "CT",
+            "MA",
+            "RI",
+        ]
+        # inside the envelope of Florida, but only open water
+        assert index.states_in_bbox((-86, 26, -85, 27)) == []
+        assert index.states_in_bbox((-80, 55, -60, 60)) == ["CN"]
+
+    def test_bbox_filter_reuses_station_locations(self):
+        metadata_requests = []
+
+        def get_metadata(station_codes, **kwargs):
+            metadata_requests.append(list(station_codes))
+            # captured 26 July 2013
+            return u"|17BC752E|WKGR1|CHIPUXET RIVER AT WEST KINGSTON|41 28 56|-71 33 06|BOX|RI|USGS01|SI|83  |002840|60|HG|15,-9|0.01,-9|0.0|13|0.0|-0.01|VB|60,-9|0.3124,-9|0.311|28|0.0|0.0|\r\n|CE4D0268|FOXR1|FOXPOINT HURRICANE BARRIER|41 48 57|-71 24 07|BOX|RI|CENED1|SU|161 |000100|30|HM|60,-9|0.01,-9|0.0|1|0.0|0.0|PA|60,-9|0.01,-9|0.0|1|0.0|0.0|TA|60,-9|0.1,-9|0.0|1|0.0|0.0|US|60,-9|1,-9|0.0|1|0.0|0.0|UD|60,-9|1,-9|0.0|1|0.0|0.0|\r\n|DD182264|USQR1|USQUEPAUG RIVER NEAR USQUEPAUG|41 28 36|-71 36 19|BOX|RI|USGS01|SI|83  |005830|60|HG|15,-9|0.01,-9|0.0|13|0.0|0.0|VB|60,-9|0.3124,-9|0.311|58|0.0|0.0|\r\n"  # noqa
+
+        self.c._get_metadata = get_metadata
+        self.c._get_stations_for_state = lambda url, force=False: [
+            "17BC752E",
+            "CE4D0268",
+            "DD182264",
+        ]
+
+        # _parse_metadata puts these stations between -70.6 and -70.3
+        self.c.filter(bbox=(-71.6, 41.45, -70.3, 41.49))
+        assert self.c.list_features() == ["17BC752E", "DD182264"]
+
+        self.c.filter(bbox=(-71.6, 41.7, -70.5, 41.9))
+        assert self.c.list_features() == ["CE4D0268"]
+
+        self.c.filter(bbox=(-71.6, 41.5, -71.4, 41.6))
+        assert self.c.list_features() == []
+
+        assert metadata_requests == [["17BC752E", "CE4D0268", "DD182264"]]
+
+    def test_force_refreshes_catalog_cache(self):
+        stations = ["AAA"]
+
+        def respond(url, data):
+            if url.endswith("RI.html"):
+                return "".join(
+                    '<a href="?nesdis_id={}">x</a>'.format(s) for s in stations
+                )
+            return '<area href="{}/RI.html">'.format(url)
+
+        cache_dir = tempfile.mkdtemp()
+        try:
+            session = FakeSession(respond)
+            cache = CatalogCache(cache_dir=cache_dir)
+            c = Hads(session=session, catalog_cache=cache)
+            assert c._get_station_codes() == ["AAA"]
+
+            stations[:] = ["BBB"]
+            c2 = Hads(session=session, catalog_cache=cache)
+            assert c2._get_station_codes() == ["AAA"]
+            assert c2._get_station_codes(force=True) == ["BBB"]
+            # The refreshed lists are cached for everyone
+            c3 = Hads(session=session, catalog_cache=cache)
+            assert c3._get_station_codes() == ["BBB"]
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_chunked_requests(self):
+        session = FakeSession(station_rows)
+        c = Hads(session=session, chunk_size=2)
+
+        text = c._get_raw_data(["A", "B", "C", "D", "E"])
+        assert sorted(session.extraids) == [["A", "B"], ["C", "D"], ["E"]]
+        assert text.splitlines() == [
+            "A|row|",
+            "B|row|",
+            "C|row|",
+            "D|row|",
+            "E|row|",
+        ]
+        assert c.failed_chunks == []
+
+        with pytest.warns(UserWarning):
+            text = c._get_metadata(["A", "B", "BAD", "C"])
+        assert text.splitlines() == ["A|row|", "B|row|"]
+        assert [chunk for chunk, _ in c.failed_chunks] == [["BAD", "C"]]
+
+        with pytest.raises(IOError):
+            c._get_metadata(["BAD"])
+
+        # A raw() call reports the failures of its metadata and data
+        # requests together
+        c.station_codes = ["A", "B", "BAD"]
+        with pytest.warns(UserWarning):
+            c.raw()
+        assert [chunk for chunk, _ in c.failed_chunks] == [
+            ["BAD"],
+            ["BAD"],
+        ]
+
+    def test_streamed_raw_data(self):
+        session = FakeSession(station_rows)
+        c = Hads(session=session, chunk_size=1)
+        lines = c._get_raw_data(["A", "BAD", "B"], stream=True)
+        assert not isinstance(lines, list)
+        # Nothing is requested until the lines are read
+        assert session.extraids == []
+
+        with pytest.warns(UserWarning):
+            codes = [line.split("|")[0] for line in lines]
+        assert codes == ["A", "B"]
+        assert [chunk for chunk, _ in c.failed_chunks] == [["BAD"]]
+        assert all(resp.closed for resp in session.responses)
+
+    def test_streamed_raw_data_stopped_early(self):
+        session = FakeSession(station_rows)
+        c = Hads(session=session, chunk_size=1)
+        lines = c._get_raw_data(["A", "B", "C"], stream=True)
+
+        assert next(lines) == "A|row|"
+        lines.close()
+        # The next chunks are never requested and the open one is closed
+        assert session.extraids == [["A"]]
+        assert all(resp.closed for resp in session.responses)
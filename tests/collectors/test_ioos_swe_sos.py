@@ -1,11 +1,20 @@
 from __future__ import absolute_import, division, print_function
 
+import shutil
+import socket
+import tempfile
+import time
 import unittest
 
 import pytest
+import requests
 from owslib.swe.sensor.sml import SensorML
+from owslib.util import ServiceException
 
+from pyoos.collectors.ioos import swe_sos
 from pyoos.collectors.ioos.swe_sos import IoosSweSos
+from pyoos.utils.cache import CatalogCache
+from tests.utils import resource_file
 
 
 class IoosSweSosTest(unittest.TestCase):
@@ -53,3 +62,123 @@ class IoosSweSosTest(unittest.TestCase):
 
 #        response = self.c.raw(responseFormat="text/xml;+subtype=\"om/1.0.0/profiles/ioos_sos/1.0\"").decode()
 #        assert isinstance(response, string_types)
+
+
+class IoosSweSosDescribeSensorTest(unittest.TestCase):
+    def setUp(self):
+        caps = open(
+            resource_file("ioos_swe/SOS-GetCapabilities.xml"), "rb"
+        ).read()
+        self.sml = open(
+            resource_file("ioos_swe/SML-DescribeSensor-Station.xml"), "rb"
+        ).read()
+        self.c = IoosSweSos("http://example.com/sos", xml=caps, max_workers=4)
+        self.c.server.describe_sensor = self.describe_sensor
+        self.requests = []
+
+    def describe_sensor(self, outputFormat=None, procedure=None, **kwargs):
+        self.requests.append((procedure, kwargs))
+        # Finish the first requests last
+        time.sleep(0.05 if procedure.endswith("0") else 0)
+        if procedure.endswith("bad"):
+            raise ServiceException("no such procedure")
+        if procedure.endswith("timeout"):
+            raise socket.timeout("timed out")
+        if procedure.endswith("down"):
+            raise requests.ConnectionError("connection refused")
+        return self.sml
+
+    def test_metadata_order(self):
+        self.c.features = ["station%d" % i for i in range(10)]
+        response = self.c.metadata(timeout=5)
+        assert len(response) == 10
+        assert all(isinstance(r, SensorML) for r in response)
+        assert sorted(p for p, _ in self.requests) == sorted(self.c.features)
+        assert all(kw == {"timeout": 5} for _, kw in self.requests)
+
+    def test_metadata_plus_exceptions_failures(self):
+        self.c.features = ["station0", "station_bad", "station2"]
+        response, failures = self.c.metadata_plus_exceptions()
+        assert sorted(response) == ["station0", "station2"]
+        assert list(failures) == ["station_bad"]
+        assert "no such procedure" in failures["station_bad"]
+
+        with self.assertRaises(ServiceException):
+            self.c.metadata()
+
+    def test_metadata_plus_exceptions_network_failures(self):
+        self.c.features = ["station0", "station_timeout", "station_down"]
+        response, failures = self.c.metadata_plus_exceptions()
+        assert list(response) == ["station0"]
+        assert failures == {
+            "station_timeout": "timed out",
+            "station_down": "connection refused",
+        }
+
+
+class CapabilitiesResponse(object):
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+class IoosSweSosCapabilitiesTest(unittest.TestCase):
+    url = "http://example.com/capabilities-test/sos"
+
+    def setUp(self):
+        self.caps = open(
+            resource_file("ioos_swe/SOS-GetCapabilities.xml"), "rb"
+        ).read()
+        self.cache_dir = tempfile.mkdtemp()
+        self.requests = []
+        swe_sos._capabilities.pop(self.url, None)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        swe_sos._capabilities.pop(self.url, None)
+
+    def get(self, url, headers=None):
+        self.requests.append((url, headers))
+        if headers and headers.get("If-None-Match") == '"v1"':
+            return CapabilitiesResponse(304)
+        return CapabilitiesResponse(200, self.caps, {"ETag": '"v1"'})
+
+    def collector(self, cache):
+        return IoosSweSos(self.url, session=self, catalog_cache=cache)
+
+    def test_lazy_cached_capabilities(self):
+        cache = CatalogCache(cache_dir=self.cache_dir)
+
+        c = self.collector(cache)
+        assert self.requests == []
+        offerings = [off.name for off in c.server.offerings]
+        assert len(self.requests) == 1
+        assert "request=GetCapabilities" in self.requests[0][0]
+        assert self.requests[0][1] == {}
+
+        # A fresh cache entry is used without a request and the parsed
+        # document is shared
+        swe_sos._capabilities.pop(self.url)
+        c2 = self.collector(cache)
+        assert [off.name for off in c2.server.offerings] == offerings
+        assert len(self.requests) == 1
+        assert self.collector(cache).server is c2.server
+
+        # A stale one is revalidated
+        stale = CatalogCache(cache_dir=self.cache_dir, ttl=0)
+        c3 = self.collector(stale)
+        assert [off.name for off in c3.server.offerings] == offerings
+        assert len(self.requests) == 2
+        assert self.requests[1][1] == {"If-None-Match": '"v1"'}
+
+    def test_response_format(self):
+        c = IoosSweSos(self.url, xml=self.caps)
+        offering = c.server.offerings[1].name
+        kwargs = {"offerings": [offering]}
+        c._set_response_format(kwargs)
+        assert "ioos_sos/1.0" in kwargs["responseFormat"]
+        assert kwargs["responseFormat"] == c.response_formats[offering]
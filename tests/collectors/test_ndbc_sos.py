@@ -3,12 +3,17 @@ from __future__ import absolute_import, division, print_function
 import csv
 import io
 import unittest
-from datetime import datetime
+import warnings
+from datetime import datetime, timedelta
 
+import pytz
 from owslib.swe.sensor.sml import SensorML
 from six import string_types
 
 from pyoos.collectors.ndbc.ndbc_sos import NdbcSos
+from pyoos.parsers.ioos.csv_observations import CsvObservations
+from pyoos.utils.etree import etree
+from tests.utils import resource_file
 
 
 class NdbcSosTest(unittest.TestCase):
@@ -104,3 +109,189 @@ class NdbcSosTest(unittest.TestCase):
         assert data[0]["date_time"] == "2012-10-01T00:00:00Z"
         assert data[0]["depth (m)"] == "-2.44"
         assert data[0]["air_pressure_at_sea_level (hPa)"] == "1019.0"
+
+
+class NdbcSosFanOutTest(unittest.TestCase):
+    def setUp(self):
+        caps = open(
+            resource_file("ioos_swe/SOS-GetCapabilities.xml"), "rb"
+        ).read()
+        self.c = NdbcSos(xml=caps)
+        self.c.server.get_observation = self.get_observation
+        self.requests = []
+
+    def get_observation(self, **params):
+        self.requests.append(params)
+        station = params["offerings"][0].split(":")[-1]
+        return (
+            b"station_id,date_time,value\n"
+            b"urn:ioos:station:wmo:%s,2012-10-01T00:00:00Z,1.0\n"
+            b"urn:ioos:station:wmo:%s,2012-10-01T01:00:00Z,2.0\n"
+        ) % (station.encode(), station.encode())
+
+    def test_one_request_per_station(self):
+        self.c.features = ["41012", "41013", "41014"]
+        self.c.variables = ["air_pressure_at_sea_level"]
+
+        response = self.c.raw().decode()
+
+        assert sorted(p["offerings"] for p in self.requests) == [
+            ["urn:ioos:station:wmo:41012"],
+            ["urn:ioos:station:wmo:41013"],
+            ["urn:ioos:station:wmo:41014"],
+        ]
+        data = list(csv.DictReader(io.StringIO(response)))
+        assert len(data) == 6
+        assert [d["station_id"] for d in data[::2]] == [
+            "urn:ioos:station:wmo:41012",
+            "urn:ioos:station:wmo:41013",
+            "urn:ioos:station:wmo:41014",
+        ]
+
+    def test_single_station(self):
+        self.c.features = ["41012"]
+        self.c.variables = ["air_pressure_at_sea_level"]
+
+        self.c.raw()
+        assert len(self.requests) == 1
+        assert self.requests[0]["offerings"] == ["urn:ioos:station:wmo:41012"]
+
+    def test_raw_merges_columns_by_name(self):
+        responses = {
+            "41012": b"station_id,date_time,value (m)\nA,2012-10-01T00:00:00Z,1.0\n",
+            "41013": b"station_id,other (s),date_time\nB,5.0,2012-10-01T01:00:00Z\n",
+        }
+
+        def get_observation(**params):
+            return responses[params["offerings"][0].split(":")[-1]]
+
+        self.c.server.get_observation = get_observation
+        self.c.features = ["41012", "41013"]
+        self.c.variables = ["air_pressure_at_sea_level"]
+
+        response = self.c.raw().decode()
+        assert response.splitlines() == [
+            "station_id,date_time,value (m),other (s)",
+            "A,2012-10-01T00:00:00Z,1.0,",
+            "B,2012-10-01T01:00:00Z,,5.0",
+        ]
+
+    def test_raw_merges_xml(self):
+        xml = open(
+            resource_file("ioos_swe/OM-GetObservation.xml"), "rb"
+        ).read()
+        self.c.server.get_observation = lambda **params: xml
+        self.c.features = ["41012", "41013"]
+        self.c.variables = ["air_pressure_at_sea_level"]
+
+        response = self.c.raw(responseFormat="text/xml")
+        root = etree.fromstring(response)
+        members = root.findall("{http://www.opengis.net/om/1.0}member")
+        assert len(members) == 4
+
+    def test_collect_csv(self):
+        self.c.features = ["41012", "41013"]
+        self.c.variables = ["air_pressure_at_sea_level"]
+
+        obs = self.c.collect()
+        assert isinstance(obs, CsvObservations)
+        assert obs.size == 4
+        assert obs.columns["value"].tolist() == [1.0, 2.0, 1.0, 2.0]
+
+    def test_unparsable_response_is_isolated(self):
+        xml = open(
+            resource_file("ioos_swe/OM-GetObservation.xml"), "rb"
+        ).read()
+
+        def get_observation(**params):
+            if params["offerings"] == ["urn:ioos:station:wmo:41013"]:
+                return b"<om:ObservationCollection"
+            return xml
+
+        self.c.server.get_observation = get_observation
+        self.c.features = ["41012", "41013", "41014"]
+        self.c.variables = ["air_pressure_at_sea_level"]
+
+        for collect in (self.c.collect, self.c.iter_collect):
+            with warnings.catch_warnings(record=True) as w:
+                warnings.simplefilter("always")
+                obs = list(collect(responseFormat="text/xml"))
+            assert len(obs) == 2
+            assert len(w) == 1
+            assert [o for o, t, e in self.c.failed_requests] == [
+                "urn:ioos:station:wmo:41013"
+            ]
+
+    def test_time_windows(self):
+        self.c.features = ["41012", "41013"]
+        self.c.variables = ["air_pressure_at_sea_level"]
+        self.c.start_time = datetime(2012, 1, 1)
+        self.c.end_time = datetime(2012, 3, 10)
+
+        obs = self.c.collect()
+
+        assert len(self.requests) == 6
+        assert sorted(set(p["eventTime"] for p in self.requests)) == [
+            "2012-01-01T00:00:00Z/2012-01-30T23:59:59Z",
+            "2012-01-31T00:00:00Z/2012-02-29T23:59:59Z",
+            "2012-03-01T00:00:00Z/2012-03-10T00:00:00Z",
+        ]
+        # Stitched back by station, then time
+        assert (
+            obs.columns["station_id"].tolist()
+            == ["urn:ioos:station:wmo:41012"] * 6
+            + ["urn:ioos:station:wmo:41013"] * 6
+        )
+
+    def test_xml_not_split_by_default(self):
+        xml = open(
+            resource_file("ioos_swe/OM-GetObservation.xml"), "rb"
+        ).read()
+
+        def get_observation(**params):
+            self.requests.append(params)
+            return xml
+
+        self.c.server.get_observation = get_observation
+        self.c.features = ["41012"]
+        self.c.variables = ["air_pressure_at_sea_level"]
+        self.c.start_time = datetime(2012, 1, 1)
+        self.c.end_time = datetime(2012, 3, 10)
+
+        self.c.raw(responseFormat="text/xml")
+        assert [p["eventTime"] for p in self.requests] == [
+            "2012-01-01T00:00:00Z/2012-03-10T00:00:00Z"
+        ]
+
+        # Unless max_window asks for it
+        self.requests = []
+        self.c.max_window = timedelta(days=30)
+        self.c.raw(responseFormat="text/xml")
+        assert len(self.requests) == 3
+
+    def test_time_windows_open_ended(self):
+        # Without end_time the range ends now
+        self.c.start_time = datetime.utcnow() - timedelta(days=45)
+        windows = self.c._time_windows()
+
+        assert len(windows) == 2
+        assert windows[0][0] == self.c.start_time
+        assert windows[1][0] == self.c.start_time + timedelta(days=30)
+        now = datetime.utcnow().replace(tzinfo=pytz.utc)
+        assert abs(windows[1][1] - now) < timedelta(minutes=1)
+
+    def test_max_window_override(self):
+        caps = open(
+            resource_file("ioos_swe/SOS-GetCapabilities.xml"), "rb"
+        ).read()
+        c = NdbcSos(xml=caps, max_window=timedelta(days=365))
+        c.server.get_observation = self.get_observation
+        c.features = ["41012"]
+        c.variables = ["air_pressure_at_sea_level"]
+        c.start_time = datetime(2012, 1, 1)
+        c.end_time = datetime(2012, 3, 10)
+
+        c.raw()
+        assert [p["eventTime"] for p in self.requests] == [
+            "2012-01-01T00:00:00Z/2012-03-10T00:00:00Z"
+        ]
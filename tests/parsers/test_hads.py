@@ -285,3 +285,59 @@ class HadsParserTest(unittest.TestCase):
             self.raw_data, [u"HM", u"UD"], (None, None)
         )
         assert parsed == res
+
+    def test__parse_data_columnar(self):
+        parsed = self.hp._parse_data(
+            self.raw_data,
+            [u"HM", u"HG"],
+            (
+                None,
+                datetime.datetime(2013, 7, 26, 16, 30).replace(
+                    tzinfo=pytz.utc
+                ),
+            ),
+            columnar=True,
+        )
+
+        assert parsed["station"].tolist() == [u"CE4D0268", u"DD182264"]
+        assert parsed["pe_code"].tolist() == [u"HM", u"HG"]
+        assert parsed["time"].tolist() == [
+            datetime.datetime(2013, 7, 26, 16, 30),
+            datetime.datetime(2013, 7, 26, 16, 30),
+        ]
+        assert parsed["value"].tolist() == [4.94, 3.07]
+
+    def test__parse_data_bad_values(self):
+        raw_data = u"CE4D0268|FOXR1|HM|2013-07-26 16:30|NaN|  |\r\nCE4D0268|FOXR1|HM|2013-07-26 17:00|  |  |\r\n"  # noqa
+
+        parsed = self.hp._parse_data(raw_data, None, (None, None))
+        values = [x[2] for x in parsed[u"CE4D0268"]]
+        assert len(values) == 2
+        assert all(v != v for v in values)
+
+    def test_parse_groups_points(self):
+        station_collection = self.hp.parse(
+            self.metadata, self.raw_data, None, (None, None)
+        )
+        stations = {s.uid: s for s in station_collection.elements}
+
+        points = stations[u"CE4D0268"].elements
+        assert [p.time for p in points] == [
+            datetime.datetime(2013, 7, 26, 16, 30, tzinfo=pytz.utc),
+            datetime.datetime(2013, 7, 26, 17, 0, tzinfo=pytz.utc),
+        ]
+        assert all(len(p.members) == 5 for p in points)
+
+        assert len(stations[u"DD182264"].elements) == 2
+        assert len(stations[u"17BC752E"].elements) == 0
+
+    def test_parse_empty(self):
+        station_collection = self.hp.parse(
+            self.metadata, u"", None, (None, None)
+        )
+        assert len(station_collection.elements) == 3
+
+    def test__parse_data_from_lines(self):
+        lines = iter(self.raw_data.splitlines())
+        parsed = self.hp._parse_data(lines, None, (None, None))
+        assert parsed == self.hp._parse_data(self.raw_data, None, (None, None))
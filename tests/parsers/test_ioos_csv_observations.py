@@ -0,0 +1,52 @@
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+import numpy as np
+
+from pyoos.parsers.ioos.csv_observations import CsvObservations
+
+NDBC_41012 = b"""station_id,sensor_id,"latitude (degree)","longitude (degree)",date_time,"depth (m)","air_pressure_at_sea_level (hPa)"
+urn:ioos:station:wmo:41012,urn:ioos:sensor:wmo:41012::baro1,30.04,-80.55,2012-10-01T00:50:00Z,0.00,1009.8
+urn:ioos:station:wmo:41012,urn:ioos:sensor:wmo:41012::baro1,30.04,-80.55,2012-10-01T01:50:00Z,0.00,
+"""  # noqa
+
+NDBC_41013 = b"""station_id,sensor_id,"latitude (degree)","longitude (degree)",date_time,"depth (m)","air_pressure_at_sea_level (hPa)",quality_flags
+urn:ioos:station:wmo:41013,urn:ioos:sensor:wmo:41013::baro1,33.44,-77.76,2012-10-01T00:50:00Z,0.00,1010.1,0;0
+"""  # noqa
+
+
+class CsvObservationsTest(unittest.TestCase):
+    def test_columns(self):
+        obs = CsvObservations(NDBC_41012)
+
+        assert obs.size == 2
+        assert list(obs.columns) == [
+            "station_id",
+            "sensor_id",
+            "latitude",
+            "longitude",
+            "date_time",
+            "depth",
+            "air_pressure_at_sea_level",
+        ]
+        assert obs.units["air_pressure_at_sea_level"] == "hPa"
+        assert obs.units["station_id"] is None
+
+        assert obs.columns["date_time"][0] == np.datetime64(
+            "2012-10-01T00:50:00"
+        )
+        assert obs.columns["latitude"].dtype == np.float64
+        assert obs.columns["air_pressure_at_sea_level"][0] == 1009.8
+        assert np.isnan(obs.columns["air_pressure_at_sea_level"][1])
+        assert obs.columns["station_id"][1] == "urn:ioos:station:wmo:41012"
+
+    def test_merged_responses(self):
+        obs = CsvObservations([NDBC_41012, NDBC_41013])
+
+        assert obs.size == 3
+        np.testing.assert_array_equal(
+            obs.columns["latitude"], [30.04, 30.04, 33.44]
+        )
+        # Text column only present in the second response
+        assert obs.columns["quality_flags"].tolist() == ["", "", "0;0"]
@@ -7,6 +7,7 @@ from datetime import datetime
 import pytz
 
 from pyoos.parsers.ioos.describe_sensor import IoosDescribeSensor
+from pyoos.utils.etree import etree
 from tests.utils import resource_file
 
 
@@ -66,3 +67,22 @@ class IoosDescribeSensorTest(unittest.TestCase):
         )
         assert d.starting == datetime(2013, 8, 26, 18, 10, tzinfo=pytz.utc)
         assert d.ending == datetime(2013, 8, 26, 18, 10, tzinfo=pytz.utc)
+
+    def test_parsed_once(self):
+        data = open(
+            resource_file(
+                os.path.join("ioos_swe", "SML-DescribeSensor-Station.xml")
+            ),
+            "rb",
+        ).read()
+        root = etree.fromstring(data)
+
+        from_bytes = IoosDescribeSensor(data)
+        from_element = IoosDescribeSensor(root)
+
+        # The root parsed by the factory is the one the instance uses
+        assert from_element._root is root
+        assert type(from_bytes) is type(from_element)
+        assert from_bytes.id == from_element.id
+        assert from_bytes.variables == from_element.variables
+        assert from_bytes.starting == from_element.starting
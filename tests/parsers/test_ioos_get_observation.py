@@ -4,19 +4,40 @@ import os
 import unittest
 from datetime import datetime
 
+import numpy as np
 import pytz
 from paegan.cdm.dsg.collections.station_collection import StationCollection
+from paegan.cdm.dsg.features.base.point import Point as PaeganPoint
 from paegan.cdm.dsg.features.station import Station
 from paegan.cdm.dsg.features.station_profile import StationProfile
 from shapely.geometry import Point, box
 
-from pyoos.parsers.ioos.get_observation import IoosGetObservation
+from pyoos.parsers.ioos.get_observation import (
+    IoosGetObservation,
+    iter_observations,
+)
 from pyoos.parsers.ioos.one.timeseries import TimeSeries
-from pyoos.parsers.ioos.one.timeseries_profile import TimeSeriesProfile
+from pyoos.parsers.ioos.one.timeseries_profile import (
+    ProfileCache,
+    TimeSeriesProfile,
+)
+from pyoos.parsers.ioos.one.trajectory import Trajectory
 from pyoos.utils.etree import etree
 from tests.utils import resource_file
 
 
+def om_with_result(swe_file):
+    """
+    OM-GetObservation.xml with the SWE record of swe_file as its result.
+    """
+    om = open(
+        resource_file(os.path.join("ioos_swe", "OM-GetObservation.xml")), "rb"
+    ).read()
+    swe = open(resource_file(os.path.join("ioos_swe", swe_file)), "rb").read()
+    swe = swe[swe.index(b"?>") + 2 :]
+    return om.replace(b"<om:result>", b"<om:result>" + swe, 1)
+
+
 class SweIoosTest(unittest.TestCase):
     def test_o_and_m_get_observation(self):
         data = open(
@@ -61,6 +82,51 @@ class SweIoosTest(unittest.TestCase):
             Point(-75.415, 32.382)
         )
 
+    def test_timeseries_observation(self):
+        data = om_with_result("SWE-MultiStation-TimeSeries.xml")
+        ob = IoosGetObservation(data).observations[0]
+
+        # The paegan feature is only built when asked for
+        assert isinstance(ob.timeseries, TimeSeries)
+        assert ob.timeseries._feature is None
+        assert "time" in ob.timeseries.columns["wmo_41001_sensor1"]
+        assert isinstance(ob.feature, StationCollection)
+        assert ob.feature is ob.timeseries.feature
+
+        dense = IoosGetObservation(data, dense=True).observations[0]
+        assert dense.feature is dense.timeseries.columns
+        assert dense.timeseries._feature is None
+
+    def test_iter_observations(self):
+        data = open(
+            resource_file(os.path.join("ioos_swe", "OM-GetObservation.xml")),
+            "rb",
+        ).read()
+
+        observations = iter_observations(data)
+        assert not isinstance(observations, list)
+        observations = list(observations)
+        expected = IoosGetObservation(data).observations
+
+        assert len(observations) == len(expected) == 1
+        ob, ex = observations[0], expected[0]
+        assert ob.feature_type == ex.feature_type == "timeSeries"
+        assert ob.procedures == ex.procedures
+        assert ob.observedProperties == ex.observedProperties
+        assert ob.begin_position == ex.begin_position
+        assert ob.bbox.equals(ex.bbox)
+        assert sorted(ob.location) == sorted(ex.location)
+
+    def test_iter_observations_unknown_version(self):
+        data = open(
+            resource_file(os.path.join("ioos_swe", "OM-GetObservation.xml")),
+            "rb",
+        ).read()
+        data = data.replace(b"<gml:version>1.0<", b"<gml:version>9.9<")
+
+        with self.assertRaises(ValueError):
+            list(iter_observations(data))
+
     def test_timeseries_multi_station_multi_sensor(self):
         swe = open(
             resource_file("ioos_swe/SWE-MultiStation-TimeSeries.xml"), "rb"
@@ -71,6 +137,92 @@ class SweIoosTest(unittest.TestCase):
         assert isinstance(collection, StationCollection)
         assert len(collection.elements) == 3
 
+    def test_timeseries_columns(self):
+        swe = open(
+            resource_file("ioos_swe/SWE-MultiStation-TimeSeries.xml"), "rb"
+        ).read()
+        ts = TimeSeries(etree.fromstring(swe))
+
+        columns = ts.columns["wmo_41001_sensor1"]
+        assert list(columns.keys()) == [
+            "time",
+            "air_temperature",
+            "wind_speed",
+            "wind_to_direction",
+        ]
+        assert columns["time"].dtype == np.dtype("datetime64[ms]")
+        assert columns["time"][0] == np.datetime64("2009-05-23T00:00:00")
+        np.testing.assert_array_equal(
+            columns["air_temperature"], [15.4, 15.8, 15.6]
+        )
+        np.testing.assert_array_equal(
+            columns["wind_to_direction"], [280, 121, 142]
+        )
+
+        # The paegan feature is only built when asked for
+        assert ts._feature is None
+        assert isinstance(ts.feature, StationCollection)
+        assert ts.feature is ts.feature
+
+    def test_timeseries_merge_points_matches_scan(self):
+        def scan_merge(pc1, pc2):
+            res = pc1[:]
+            for p in pc2:
+                for sp in res:
+                    if sp.time == p.time and (
+                        sp.location is None or sp.location.equals(p.location)
+                    ):
+                        sp.members.extend(p.members)
+                        break
+                else:
+                    res.append(p)
+            return res
+
+        def make_points(spec):
+            points = []
+            for t, loc, value in spec:
+                pt = PaeganPoint()
+                pt.time = datetime(2009, 5, 23, t, tzinfo=pytz.utc)
+                pt.location = Point(*loc) if loc is not None else None
+                pt.add_member(dict(name="v", value=value))
+                points.append(pt)
+            return points
+
+        spec1 = [
+            (0, (-75.415, 32.382, 0.5), 1),
+            (1, None, 2),
+            (1, (-75.415, 32.382), 3),
+            (2, (-72.73, 34.7), 4),
+        ]
+        spec2 = [
+            (0, (-75.415, 32.382, 2.0), 5),
+            (1, (-75.415, 32.382), 6),
+            (2, (-72.73, 34.7000001), 7),
+            (3, (-72.73, 34.7), 8),
+            (3, (-72.73, 34.7), 9),
+            (2, (-72.73, 34.7), 10),
+        ]
+
+        swe = open(
+            resource_file("ioos_swe/SWE-MultiStation-TimeSeries.xml"), "rb"
+        ).read()
+        ts = TimeSeries(etree.fromstring(swe))
+
+        expected = scan_merge(make_points(spec1), make_points(spec2))
+        merged = ts._merge_points(make_points(spec1), make_points(spec2))
+
+        def summary(points):
+            return [
+                (
+                    p.time,
+                    p.location.wkt if p.location is not None else None,
+                    [m["value"] for m in p.members],
+                )
+                for p in points
+            ]
+
+        assert summary(merged) == summary(expected)
+
     def test_timeseries_single_station_single_sensor(self):
         swe = open(
             resource_file(
@@ -191,3 +343,104 @@ class SweIoosTest(unittest.TestCase):
         assert (
             sensor["sensor_orientation"]["Z"]["name"] == "platform_orientation"
         )
+
+    def test_profile_cache_orders_points_by_z(self):
+        cache = ProfileCache()
+        sensor = {
+            "location": {"point": Point(-75.0, 32.0, 0.0)},
+            "station": "urn:ioos:station:wmo:41001",
+        }
+        t = datetime(2009, 5, 23, tzinfo=pytz.utc)
+        for z, value in [(-4.5, 1), (-39.5, 2), (-9.5, 3), (-4.5, 4)]:
+            cache.add_obs(
+                sensor,
+                t,
+                Point(-75.0, 32.0, z),
+                [dict(name="v", value=value)],
+            )
+
+        collection = cache.get_collections()["urn:ioos:station:wmo:41001"]
+        profile = collection.elements[0]
+        assert [p.location.z for p in profile.elements] == [-39.5, -9.5, -4.5]
+        assert [[m["value"] for m in p.members] for p in profile.elements] == [
+            [2],
+            [3],
+            [1, 4],
+        ]
+
+    def test_timeseries_profile_dense(self):
+        swe = open(
+            resource_file(
+                "ioos_swe/SWE-SingleStation-TimeSeriesProfile_QC.xml"
+            ),
+            "rb",
+        ).read()
+        tsp = TimeSeriesProfile(etree.fromstring(swe), dense=True)
+        assert tsp.feature is None
+
+        sensors = tsp.arrays["urn:ioos:station:wmo:41001"]
+        adcp = sensors["wmo_41001_sensor1"]
+        assert adcp["variables"] == [
+            "direction_of_sea_water_velocity",
+            "sea_water_speed",
+        ]
+        assert adcp["values"].shape == (3, 5, 2)
+        assert adcp["quality"].shape == (3, 5, 2)
+        np.testing.assert_array_equal(
+            adcp["bin_center"], [-10, -20, -30, -40, -50]
+        )
+        np.testing.assert_array_equal(
+            adcp["z"], [-9.5, -19.5, -29.5, -39.5, -49.5]
+        )
+
+        # Same values as the fourth bin of the first profile in the tree
+        np.testing.assert_array_equal(adcp["values"][0, 3], [352.0, 9.6])
+        assert adcp["quality"][0, 3, 0] == "y"
+        assert np.isnan(adcp["values"][1, 0]).all()
+
+        thermistor = sensors["wmo_41001_sensor2"]
+        np.testing.assert_array_equal(thermistor["height"], [-5, -10, -20])
+        assert thermistor["quality"] is None
+        np.testing.assert_array_equal(
+            thermistor["values"][:, :, 0],
+            [[13.7, 16.8, 19.2], [13.5, 16.4, 19.3], [13.4, 16.5, 18.8]],
+        )
+
+    def test_trajectory_profile(self):
+        data = open(resource_file("ndbc_trajectory.xml"), "rb").read()
+
+        # NDBC sends no ioosTemplateVersion with trajectories
+        observations = IoosGetObservation(data).observations
+        assert len(observations) == 1
+        ob = observations[0]
+        assert ob.feature_type == "trajectoryProfile"
+
+        streamed = list(iter_observations(data))
+        assert len(streamed) == 1
+        assert isinstance(streamed[0].feature, Trajectory)
+        np.testing.assert_array_equal(streamed[0].feature.z, ob.feature.z)
+
+        glider = ob.feature
+        assert isinstance(glider, Trajectory)
+        assert glider.properties == {
+            "station_id": "urn:ioos:station:wmo:48900"
+        }
+        assert list(glider.variables) == ["sea_water_salinity"]
+        assert glider.units["sea_water_salinity"] == "psu"
+        assert glider.size == len(glider.time) == len(glider.z) == 2041
+        assert glider.time[0] == np.datetime64("2010-07-26T00:02:00")
+        assert glider.lat[0] == 39.28
+        assert glider.lon[0] == -73.819
+
+        # One profile per position of the glider
+        assert len(glider.profile_offsets) == 69
+        assert glider.profile_offsets[-1] == glider.size
+        first = glider.profile(0)
+        assert len(first["z"]) == 35
+        np.testing.assert_array_equal(first["z"][:3], [0, 4, 5])
+        np.testing.assert_array_equal(
+            first["sea_water_salinity"][:3], [29.82, 29.74, 29.85]
+        )
+        last = glider.profile(67)
+        assert (last["time"] == np.datetime64("2010-07-26T23:51:00")).all()
+        assert last["lon"][0] == -73.812
@@ -0,0 +1,63 @@
+from __future__ import absolute_import, division, print_function
+
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from pyoos.utils.asatime import AsaTime
+
+
+class AsaTimeTest(unittest.TestCase):
+    def test_parse_fixed_formats(self):
+        assert AsaTime.parse("2013-07-26T16:30:00Z") == datetime(
+            2013, 7, 26, 16, 30, tzinfo=pytz.utc
+        )
+        assert AsaTime.parse("2013-07-26 16:30") == datetime(
+            2013, 7, 26, 16, 30
+        )
+        # NERRS utcStamp
+        assert AsaTime.parse("5/29/2013 0:15") == datetime(2013, 5, 29, 0, 15)
+        assert AsaTime.get_format("2014-01-01T00:00:00Z") == (
+            "%Y-%m-%dT%H:%M:%SZ",
+            True,
+        )
+
+    def test_parse_fallback(self):
+        assert AsaTime.parse("2013-07-26T16:30:00-05:00") == datetime(
+            2013, 7, 26, 21, 30, tzinfo=pytz.utc
+        )
+        assert AsaTime.parse("2013-07-04 12:00 AKST") == datetime(
+            2013, 7, 4, 21, 0, tzinfo=pytz.utc
+        )
+        with self.assertRaises(ValueError):
+            AsaTime.parse("not a date")
+
+    def test_parse_column(self):
+        times = AsaTime.parse_column(
+            ["2013-07-26T16:30:00Z", "2013-07-26T16:45:00Z"]
+        )
+        assert str(times.dtype) == "datetime64[s]"
+        assert times.tolist() == [
+            datetime(2013, 7, 26, 16, 30),
+            datetime(2013, 7, 26, 16, 45),
+        ]
+
+        # mixed formats and offsets are converted to naive UTC
+        times = AsaTime.parse_column(
+            ["5/29/2013 0:15", "2013-05-29T00:30:00-05:00"]
+        )
+        assert times.tolist() == [
+            datetime(2013, 5, 29, 0, 15),
+            datetime(2013, 5, 29, 5, 30),
+        ]
+
+        assert len(AsaTime.parse_column([])) == 0
+
+        # a string in another format outside of the sampled ones
+        strings = ["2013-07-26T16:30:00Z"] * 2001
+        strings[1] = "7/26/2013 16:45"
+        times = AsaTime.parse_column(strings)
+        assert times[0] == np.datetime64("2013-07-26T16:30:00")
+        assert times[1] == np.datetime64("2013-07-26T16:45:00")
@@ -0,0 +1,29 @@
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from pyoos.parsers.ioos.one.timeseries import TimeSeries
+from pyoos.utils.crs import get_crs
+from pyoos.utils.etree import etree
+from tests.utils import resource_file
+
+
+class CrsTest(unittest.TestCase):
+    def test_interned(self):
+        crs = get_crs("urn:ogc:def:crs:EPSG::4326")
+        assert crs.code == 4326
+        assert crs.axisorder == "yx"
+        assert get_crs("urn:ogc:def:crs:EPSG::4326") is crs
+        assert get_crs("EPSG:4326") is not crs
+
+    def test_shared_by_stations(self):
+        swe = open(
+            resource_file("ioos_swe/SWE-MultiStation-TimeSeries.xml"), "rb"
+        ).read()
+        ts = TimeSeries(etree.fromstring(swe))
+
+        srss = set(
+            id(s.get_property("horizontal_srs")) for s in ts.stations.values()
+        )
+        assert len(ts.stations) == 3
+        assert len(srss) == 1
@@ -0,0 +1,35 @@
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from pyoos.utils.etree import etree
+from pyoos.utils.xpath import XPathRegistry
+
+DOC = b"""<a:root xmlns:a="http://a" xmlns:b="http://b">
+  <a:item b:kind="x" name="one"><b:value>1</b:value></a:item>
+  <a:item name="two" ref="http://b/two"><b:value>2</b:value></a:item>
+</a:root>"""
+
+
+class XPathRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.xpaths = XPathRegistry(
+            {"a": "http://a", "b": "http://b"}, ["a:item/b:value"]
+        )
+        self.root = etree.fromstring(DOC)
+
+    def test_name(self):
+        assert self.xpaths.name("b:kind") == "{http://b}kind"
+        assert (
+            self.xpaths.name(".//a:item[@ref='http://b/two']/b:value")
+            == ".//{http://a}item[@ref='http://b/two']/{http://b}value"
+        )
+
+    def test_find(self):
+        values = self.xpaths.findall(self.root, "a:item/b:value")
+        assert [v.text for v in values] == ["1", "2"]
+
+        found = self.xpaths.find(self.root, ".//a:item[@name='two']/b:value")
+        assert found.text == "2"
+        assert self.xpaths.find(self.root, "b:value") is None
+        assert self.xpaths.findall(self.root, "b:value") == []